@@ -1,52 +1,52 @@
-import os
 import requests
-from requests.auth import HTTPBasicAuth
-import dotenv
+import pandas as pd
 import streamlit as st
 
-# Carrega variáveis do .env
-dotenv.load_dotenv()
-
-# 1️⃣ Autenticação
-def autenticar():
-    client_id = os.environ["CHAVE_API_SPOTIFY"]
-    client_secret = os.environ["CHAVE_CLIENT_SECRET"]
-    auth = HTTPBasicAuth(username=client_id, password=client_secret)
-    url_token = "https://accounts.spotify.com/api/token"
-    body = {"grant_type": "client_credentials"}
-    resposta = requests.post(url=url_token, data=body, auth=auth)
-    resposta.raise_for_status()
-    return resposta.json()["access_token"]
-
-# 2️⃣ Buscar múltiplos artistas parecidos
-def buscar_artistas_parecidos(nome_artista, headers):
-    url = "https://api.spotify.com/v1/search"
-    params = {
-        'q': nome_artista,
-        "type": "artist",
-        "limit": 5
-    }
-    resposta = requests.get(url, params=params, headers=headers)
+from cliente_spotify import ClienteSpotify
 
+# 1️⃣ Autenticação (token e sessão reaproveitados entre reruns)
+@st.cache_resource(show_spinner=False)
+def obter_cliente():
+    return ClienteSpotify()
+
+# 2️⃣ Buscar múltiplos artistas parecidos (cada texto digitado fica no cache de buscas do cliente)
+def buscar_artistas_parecidos(nome_artista, cliente):
     try:
-        resposta.raise_for_status()
-        return resposta.json()['artists']['items']
+        return cliente.buscar_artistas(nome_artista, limite=5)
     except (requests.HTTPError, KeyError):
         return []
 
 # 3️⃣ Buscar top músicas
-def buscar_top_musicas(id_artista, headers, pais="BR"):
-    url = f"https://api.spotify.com/v1/artists/{id_artista}/top-tracks"
-    params = {"market": pais}
-    resposta = requests.get(url, headers=headers, params=params)
+def buscar_top_musicas(id_artista, cliente, pais="BR"):
     try:
-        resposta.raise_for_status()
-        return resposta.json()['tracks']
+        return cliente.buscar_top_musicas(id_artista, pais)
     except requests.HTTPError as erro:
         st.error(f"Erro ao buscar top músicas: {erro}")
         return []
 
-# 4️⃣ Interface principal
+# 4️⃣ Comparar vários artistas (multi-get + top músicas em paralelo)
+def comparar_artistas(ids_artistas, cliente, pais="BR"):
+    try:
+        artistas = cliente.obter_artistas(ids_artistas)
+        top_por_artista = cliente.buscar_top_musicas_varios([a["id"] for a in artistas], pais)
+    except requests.HTTPError as erro:
+        st.error(f"Erro ao comparar artistas: {erro}")
+        return pd.DataFrame()
+
+    linhas = []
+    for artista in artistas:
+        musicas = top_por_artista.get(artista["id"], [])[:10]
+        popularidades = [m["popularity"] for m in musicas]
+        linhas.append({
+            "Artista": artista["name"],
+            "Seguidores": artista["followers"]["total"],
+            "Popularidade": artista["popularity"],
+            "Música mais popular": musicas[0]["name"] if musicas else "-",
+            "Popularidade média (Top 10)": round(sum(popularidades) / len(popularidades), 1) if popularidades else None,
+        })
+    return pd.DataFrame(linhas)
+
+# 5️⃣ Interface principal
 def main():
     st.set_page_config(page_title="Spotify Top 10", page_icon="🎧")
     st.title("🎶 Web App - Top 10 Músicas no Spotify")
@@ -55,10 +55,9 @@ def main():
     nome_artista_busca = st.text_input("Digite o nome de um artista:")
 
     if nome_artista_busca:
-        token = autenticar()
-        HEADERS = {"Authorization": f"Bearer {token}"}
+        cliente = obter_cliente()
 
-        lista_artistas = buscar_artistas_parecidos(nome_artista_busca, headers=HEADERS)
+        lista_artistas = buscar_artistas_parecidos(nome_artista_busca, cliente)
 
         if lista_artistas:
             nomes_exibicao = [
@@ -76,7 +75,7 @@ def main():
             if imagem_artista:
                 st.image(imagem_artista, width=200)
 
-            top_musicas = buscar_top_musicas(id_artista, headers=HEADERS)
+            top_musicas = buscar_top_musicas(id_artista, cliente)
 
             st.markdown("### 🔥 Top 10 Músicas:")
             for i, musica in enumerate(top_musicas[:10], start=1):
@@ -96,6 +95,12 @@ def main():
                     st.audio(preview)
 
                 st.markdown("---")
+
+            st.markdown("### ⚖️ Comparar artistas")
+            selecionados = st.multiselect("Selecione os artistas para comparar:", nomes_exibicao)
+            if len(selecionados) >= 2:
+                ids = [lista_artistas[nomes_exibicao.index(n)]["id"] for n in selecionados]
+                st.dataframe(comparar_artistas(ids, cliente), use_container_width=True)
         else:
             st.error("⚠️ Nenhum artista encontrado para a busca.")
 
@@ -1,12 +1,14 @@
-import requests
 from pprint import pprint
 
+from cliente_api import obter_cliente
+
 def pegar_ids_estados():
-    url = "https://servicodados.ibge.gov.br/api/v1/localidades/estados"
     params = {
         'view': 'nivelado',
     }
-    dados_estados = fazer_request(url, params=params)
+    dados_estados = fazer_request("v1/localidades/estados", params=params)
+    if not dados_estados:
+        return None
     dict_estados = {}
     for dados in dados_estados:
         id_estado = dados['UF-id']
@@ -14,16 +16,8 @@ def pegar_ids_estados():
         dict_estados[id_estado] = nome_estado
     return dict_estados
 
-def fazer_request(url, params=None):
-    resposta = requests.get(url, params=params)
-    print(resposta.request.url)
-    try:
-        resposta.raise_for_status()
-    except requests.HTTPError as erro:
-        print(f"\nErro no request: {erro}.")
-        return None
-    else:
-        return resposta.json()
+def fazer_request(endpoint, params=None):
+    return obter_cliente("ibge").obter_json(endpoint, params)
 
 def main():
     dict_estados = pegar_ids_estados()
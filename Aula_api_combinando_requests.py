@@ -1,19 +1,11 @@
-import os
-import requests
-import dotenv
 import pandas as pd
 import streamlit as st
 import plotly.express as px
 
-# Carrega a chave da API
-dotenv.load_dotenv()
-TOKEN = os.getenv("CHAVE_API_FIPE")
+from cliente_api import obter_cliente
+from referencias_fipe import montar_historico
+from worker_fipe import ler_fixos, revalidar_se_necessario, versao_armazem
 
-HEADERS = {
-    "accept": "application/json",
-    "X-Subscription-Token": TOKEN
-}
-URL_BASE = "https://fipe.parallelum.com.br/api/v2"
 NUM_MESES = 24
 
 # Lista de veículos fixos
@@ -29,12 +21,7 @@ VEICULOS_FIXOS = [
 # Requisição de dados
 
 def requisitar_dados(endpoint, parametros=None):
-    try:
-        resposta = requests.get(f"{URL_BASE}/{endpoint}", headers=HEADERS, params=parametros)
-        resposta.raise_for_status()
-        return resposta.json()
-    except requests.HTTPError:
-        return None
+    return obter_cliente("fipe_v2").obter_json(endpoint, parametros)
 
 def ordenar_marcas_por_relevancia(marcas):
     prioridades = [
@@ -52,13 +39,9 @@ def obter_codigo_por_nome(lista, chave_nome):
     return None
 
 def consultar_preco_por_referencia(cod_marca, cod_modelo, cod_ano, ref_code):
-    url = f"{URL_BASE}/cars/brands/{cod_marca}/models/{cod_modelo}/years/{cod_ano}"
-    params = {"reference": ref_code}
-    resposta = requests.get(url, headers=HEADERS, params=params)
-    if resposta.status_code == 200:
-        dados = resposta.json()
-        return dados.get("price", None)
-    return None
+    endpoint = f"cars/brands/{cod_marca}/models/{cod_modelo}/years/{cod_ano}"
+    dados = requisitar_dados(endpoint, {"reference": ref_code})
+    return dados.get("price", None) if dados else None
 
 def obter_historico_veiculo(marca, modelo_nome, ano_str):
     marcas = requisitar_dados("cars/brands")
@@ -92,10 +75,17 @@ def obter_historico_veiculo(marca, modelo_nome, ano_str):
                 continue
     if len(historico) < 2:
         return None
-    df = pd.DataFrame(historico).sort_index(ascending=False).reset_index(drop=True)
+    return adicionar_variacao(montar_historico(historico))
+
+def adicionar_variacao(df):
+    df = df.copy()
     df["Variação (R$)"] = df["Preço (R$)"].diff()
-    df = df.iloc[1:].reset_index(drop=True)
-    return df
+    return df.iloc[1:]
+
+@st.cache_data(show_spinner=False)
+def ler_historicos_fixos(versao):
+    # Veículos fixos vêm só do armazém local (worker_fipe.py); `versao` muda a cada escrita
+    return [adicionar_variacao(df) if df is not None else None for *_, df in ler_fixos(VEICULOS_FIXOS, NUM_MESES + 1)]
 
 def exibir_historico(df):
     preco_atual = df["Preço (R$)"].iloc[-1]
@@ -119,9 +109,10 @@ def exibir_historico(df):
 
     with col2:
         st.markdown("### 📈 Evolução dos Preços")
-        fig = px.line(df, x="Mês", y="Preço (R$)", markers=True, title=f"Histórico de Preços FIPE – Últimos {NUM_MESES} meses")
+        fig = px.line(df, x=df.index, y="Preço (R$)", markers=True, hover_data=["Mês"], title=f"Histórico de Preços FIPE – Últimos {NUM_MESES} meses")
         fig.update_layout(
             xaxis_title="Mês de Referência",
+            xaxis_tickformat="%m/%Y",
             yaxis_title="Preço (R$)",
             yaxis_range=[df["Preço (R$)"].min() * 0.75, df["Preço (R$)"].max() * 1.25],
             hovermode="x unified"
@@ -160,14 +151,15 @@ def main():
     st.markdown("---")
     st.markdown("### 🔒 Histórico de Preço - Veículos Fixos")
 
-    for marca, modelo, ano in VEICULOS_FIXOS:
+    # Stale-while-revalidate: nada de API aqui; se o armazém estiver velho, atualiza em segundo plano
+    revalidar_se_necessario()
+    for (marca, modelo, ano), df_hist in zip(VEICULOS_FIXOS, ler_historicos_fixos(versao_armazem())):
         st.markdown(f"#### 🚘 {marca} - {modelo} ({ano})")
-        df_hist = obter_historico_veiculo(marca, modelo, ano)
         if df_hist is not None:
             veiculos_comparacao.append((f"{marca} {modelo} ({ano})", df_hist))
             exibir_historico(df_hist)
         else:
-            st.warning("❌ Não foi possível obter o histórico.")
+            st.info("⏳ Histórico ainda não está no armazém local; a atualização roda em segundo plano.")
 
     if veiculos_comparacao:
         st.markdown("---")
@@ -1,24 +1,79 @@
-import requests
 import streamlit as st
 import pandas as pd
 
+from cache_ttl import CacheTTL
+from nomes_ibge import IndiceNomes, baixar_frequencias_lote, chave_nome
 
-def fazer_request(url, parametros=None):
-    try:
-        resposta = requests.get(url, params=parametros)
-        resposta.raise_for_status()
-        return resposta.json()
-    except requests.HTTPError as erro:
-        st.error(f"Erro na requisição: {erro}")
-        return None
+TTL_NOMES = 7 * 24 * 3600  # dados do censo não mudam
+
+
+@st.cache_resource(show_spinner=False)
+def obter_indice_nomes():
+    return IndiceNomes.carregar()
+
+
+@st.cache_resource(show_spinner=False)
+def obter_cache_nomes():
+    return CacheTTL(ttl=TTL_NOMES, max_itens=10000)
+
+
+def obter_dados_varios_nomes(nomes):
+    # Base local (nomes_ibge.py) → cache por nome → API em lotes "nome1|nome2|..."
+    indice = obter_indice_nomes()
+    cache = obter_cache_nomes()
+    resultado = {}
+    faltantes = []
+    for nome in dict.fromkeys(chave for chave in map(chave_nome, nomes) if chave):
+        dados = indice.frequencia_por_decada(nome) if indice is not None else None
+        if dados is None:
+            dados = cache.obter(nome)
+        if dados is None:
+            faltantes.append(nome)
+        else:
+            resultado[nome] = dados
+
+    if faltantes:
+        for nome, dados in baixar_frequencias_lote(faltantes).items():
+            if dados is None:
+                st.error(f"Erro na requisição para o nome {nome.title()}.")
+                dados = []
+            else:
+                cache.guardar(nome, dados)
+            resultado[nome] = dados
+    return resultado
 
 
 def obter_dados_por_decadas(nome):
-    url = f'https://servicodados.ibge.gov.br/api/v2/censos/nomes/{nome.lower()}'
-    dados = fazer_request(url)
-    if not dados:
-        return []
-    return dados[0]['res']
+    return obter_dados_varios_nomes([nome]).get(chave_nome(nome), [])
+
+
+def formatar_milhar(serie):
+    # Mesma saída do antigo apply(lambda x: f"{x:,}".replace(",", ".")): 1234567 → "1.234.567"
+    return serie.astype("int64").map("{:,}".format).str.replace(",", ".", regex=False)
+
+
+def exibir_comparacao(nomes):
+    dados_por_nome = obter_dados_varios_nomes(nomes)
+    encontrados = {nome: dados for nome, dados in dados_por_nome.items() if dados}
+    ausentes = [nome.title() for nome, dados in dados_por_nome.items() if not dados]
+    if ausentes:
+        st.warning("⚠️ Nenhum dado encontrado para: " + ", ".join(ausentes))
+    if not encontrados:
+        return
+
+    df = pd.DataFrame(
+        [(nome.title(), r["periodo"], r["frequencia"]) for nome, dados in encontrados.items() for r in dados],
+        columns=["Nome", "Década", "Frequência"]
+    )
+    tabela = df.pivot(index="Década", columns="Nome", values="Frequência").fillna(0).astype("int64")
+
+    col1, col2 = st.columns([1, 1.3])
+    with col1:
+        st.subheader("📄 Tabela por Década")
+        st.table(tabela.apply(formatar_milhar))
+    with col2:
+        st.subheader("📈 Gráfico Comparativo")
+        st.line_chart(data=tabela, use_container_width=True, height=400)
 
 
 def main():
@@ -30,6 +85,16 @@ def main():
         "com dados estatísticos por década sobre nomes próprios."
     )
 
+    modo = st.radio("Modo de consulta:", ["Nome único", "Comparar nomes"], horizontal=True)
+    if modo == "Comparar nomes":
+        entrada = st.text_input("Digite os nomes separados por vírgula:", placeholder="Ex: Rafael, Maria, João")
+        nomes = [n for n in entrada.split(",") if n.strip()]
+        if nomes:
+            exibir_comparacao(nomes)
+        else:
+            st.info("Digite dois ou mais nomes acima para comparar.")
+        return
+
     nome = st.text_input("Digite um nome para consultar:", placeholder="Ex: Rafael")
 
     if nome:
@@ -37,11 +102,15 @@ def main():
 
         if not dados:
             st.warning("⚠️ Nenhum dado encontrado para o nome informado.")
+            indice = obter_indice_nomes()
+            sugestoes = indice.buscar_prefixo(nome) if indice is not None else []
+            if sugestoes:
+                st.caption("Nomes parecidos na base: " + ", ".join(n.title() for n in sugestoes))
         else:
             df = pd.DataFrame(dados)
             df.columns = ['Década', 'Frequência']
             df['Frequência'] = df['Frequência'].astype(int)
-            df['Frequência'] = df['Frequência'].apply(lambda x: f"{x:,}".replace(",", "."))
+            df['Frequência'] = formatar_milhar(df['Frequência'])
 
             # Layout com colunas ajustadas
             col1, col2 = st.columns([1, 1.3])
@@ -1,34 +1,54 @@
-import os
-import requests
-import dotenv
+import pandas as pd
 import streamlit as st
 
+from cliente_openweather import ClienteOpenWeather
 
-def requisitar_dados(url, parametros=None):
-    try:
-        resposta = requests.get(url, params=parametros)
-        resposta.raise_for_status()
-        return resposta.json()
-    except requests.HTTPError as erro:
-        print(f"[ERRO] Não foi possível obter os dados: {erro}")
-        return None
+
+@st.cache_resource(show_spinner=False)
+def obter_cliente():
+    # Config (.env), sessão e cache carregados uma vez e compartilhados entre sessões
+    return ClienteOpenWeather()
 
 def pegar_tempo_para_local(local):
-    dotenv.load_dotenv()
-    token = os.environ["CHAVE_API_OPENWEATHER"]
-    url = "https://api.openweathermap.org/data/2.5/weather"
-    params = {
-        'appid': token,
-        'q': local,
-        'units': 'metric',
-        'lang': 'pt_br'
-    }
-    return requisitar_dados(url, params)
+    return obter_cliente().tempo_para_local(local)
+
+def pegar_tempo_para_varios(locais):
+    return obter_cliente().tempo_para_varios(locais)
+
+def exibir_painel(locais):
+    dados_por_local = pegar_tempo_para_varios(locais)
+    nao_encontrados = [local for local, dados in dados_por_local.items() if not dados]
+    if nao_encontrados:
+        st.warning("Dados não encontrados para: " + ", ".join(nao_encontrados))
+
+    linhas = [
+        {
+            "Cidade": dados['name'],
+            "Temperatura (°C)": dados['main']['temp'],
+            "Sensação (°C)": dados['main']['feels_like'],
+            "Descrição": dados['weather'][0]['description'].capitalize(),
+            "Umidade (%)": dados['main']['humidity'],
+            "Vento (m/s)": dados['wind']['speed'],
+        }
+        for dados in dados_por_local.values() if dados
+    ]
+    if linhas:
+        st.dataframe(pd.DataFrame(linhas).sort_values("Temperatura (°C)", ascending=False),
+                     use_container_width=True, hide_index=True)
 
 def main():
     st.title('🌦️ Web App Tempo')
     st.write('Fonte dos dados: [OpenWeather](https://openweathermap.org/current)')
 
+    modo = st.radio("Modo:", ["Uma cidade", "Painel de cidades"], horizontal=True)
+    if modo == "Painel de cidades":
+        entrada = st.text_area('📍 Digite as cidades, uma por linha:', placeholder="Brasília\nSão Paulo\nRecife")
+        locais = [l for l in entrada.splitlines() if l.strip()]
+        if not locais:
+            st.stop()
+        exibir_painel(locais)
+        st.stop()
+
     local = st.text_input('📍 Digite uma cidade:')
     if not local:
         st.stop()
@@ -1,4 +1,5 @@
 import time
+import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
@@ -54,3 +55,7 @@ else:
     print(f"\n✅ Total de anúncios coletados: {len(dados)}")
     for item in dados:
         print(f"\n🚗 {item['produto']}\n💰 {item['preco']}\n🔗 {item['link']}")
+
+    # Salva os anúncios para o casamento com a tabela FIPE (matching_olx_fipe.py)
+    pd.DataFrame(dados).to_csv("anuncios_olx.csv", sep=";", index=False, encoding="utf-8-sig")
+    print("\n✅ Arquivo 'anuncios_olx.csv' salvo com sucesso!")
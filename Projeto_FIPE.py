@@ -1,59 +1,101 @@
-import os
-import requests
-import dotenv
+import re
 import pandas as pd
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
-import time
 
-# Carrega a chave da API
-dotenv.load_dotenv()
-TOKEN = os.getenv("CHAVE_API_FIPE")
+from cache_memoria import memorizar, obter_cache
+from cliente_api import obter_cliente
+from fontes_fipe import VeiculoFipe, obter_seletor
+from indice_prefixo import IndicePrefixo
+from referencias_fipe import data_do_mes, montar_historico
+from tipos_veiculo import TIPO_PADRAO, TIPOS_VEICULO, caminho_v2
+from worker_fipe import ler_fixos, revalidar_se_necessario, versao_armazem
 
-HEADERS = {
-    "accept": "application/json",
-    "X-Subscription-Token": TOKEN,
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/115.0.0.0 Safari/537.36"
-}
-
-URL_BASE = "https://fipe.parallelum.com.br/api/v2"
 NUM_MESES = 24
-
-
-@st.cache_data(show_spinner=False)
+TTL_CATALOGO = 6 * 3600  # marcas/modelos/referências e históricos: referência nova uma vez por mês
+TTL_PRECO = 24 * 3600
+LIMITE_OPCOES_MODELO = 200  # o seletor de modelo mostra no máximo isso; o filtro de texto refina
+
+MARCAS_PRIORITARIAS = re.compile("|".join(map(re.escape, [
+    "VolksWagen", "Fiat", "Chevrolet", "Toyota", "Ford", "Honda",
+    "Hyundai", "Renault", "Nissan", "Jeep", "Peugeot", "Citroën", "Mitsubishi"
+])))
+
+VEICULOS_FIXOS = [
+    ("Toyota Corolla XEi 2.0 Flex (2012)", "Toyota", "Corolla XEi 2.0 Flex 16V Aut.", 2012),
+    ("Nissan Sentra SL 2.0 Flex (2016)", "Nissan", "Sentra SL 2.0/ 2.0 Flex Fuel 16V Aut.", 2016),
+    ("Honda Civic Sed. LXL 1.8 Flex (2013)", "Honda", "Civic Sed. LXL/ LXL SE 1.8 Flex 16V Aut.", 2013),
+    ("Hyundai ix35 GLS 2.0 Flex (2012)", "Hyundai", "ix35 GLS 2.0 16V 2WD Flex Aut.", 2012),
+    ("Hyundai Santa Fe 3.3 V6 (2012)", "Hyundai", "Santa Fe/GLS 3.3 V6 4X4 Tiptronic", 2012),
+    ("Kia Sportage EX 2.0 Flex (2012)", "Kia Motors", "Sportage EX 2.0 16V/ 2.0 16V Flex Aut.", 2012),
+]
+
+
+@memorizar("fipe", ttl=TTL_CATALOGO)
 def requisitar_dados(endpoint, parametros=None):
-    try:
-        resposta = requests.get(f"{URL_BASE}/{endpoint}", headers=HEADERS, params=parametros)
-        resposta.raise_for_status()
-        return resposta.json()
-    except requests.RequestException:
-        return None
+    return obter_cliente("fipe_v2").obter_json(endpoint, parametros)
 
 
 def ordenar_marcas_por_relevancia(marcas):
     if not marcas:
         return []
-    prioridades = [
-        "VolksWagen", "Fiat", "Chevrolet", "Toyota", "Ford", "Honda",
-        "Hyundai", "Renault", "Nissan", "Jeep", "Peugeot", "Citroën", "Mitsubishi"
-    ]
-    principais = [m for m in marcas if any(p in m['name'] for p in prioridades)]
-    demais = [m for m in marcas if m not in principais]
+    # Uma passada: cada nome é testado contra todas as prioridades de uma vez
+    principais, demais = [], []
+    for m in marcas:
+        (principais if MARCAS_PRIORITARIAS.search(m['name']) else demais).append(m)
     return principais + sorted(demais, key=lambda x: x['name'])
 
 
-@st.cache_data(show_spinner=False)
-def consultar_preco_por_referencia(cod_marca, cod_modelo, cod_ano, ref_code):
-    url = f"{URL_BASE}/cars/brands/{cod_marca}/models/{cod_modelo}/years/{cod_ano}"
-    params = {"reference": ref_code}
-    try:
-        resposta = requests.get(url, headers=HEADERS, params=params)
-        resposta.raise_for_status()
-        dados = resposta.json()
-        return dados.get("price", None)
-    except:
+# --- Opções dos seletores: montadas uma vez por catálogo (mesmo TTL das listas da API) e servidas da
+# memória; um rerun só consulta dicionários prontos
+
+@memorizar("fipe", ttl=TTL_CATALOGO)
+def opcoes_marcas(tipo=TIPO_PADRAO):
+    marcas = ordenar_marcas_por_relevancia(requisitar_dados(f"{caminho_v2(tipo)}/brands"))
+    if not marcas:
+        return None
+    rotulos = [f"{m['name']} (cód: {m['code']})" for m in marcas]
+    return {
+        "opcoes": [""] + rotulos,
+        "codigos": {r: m['code'] for r, m in zip(rotulos, marcas)},
+        "nomes": {r: m['name'] for r, m in zip(rotulos, marcas)},
+    }
+
+
+@memorizar("fipe", ttl=TTL_CATALOGO)
+def opcoes_modelos(tipo, cod_marca):
+    modelos = requisitar_dados(f"{caminho_v2(tipo)}/brands/{cod_marca}/models")
+    if not modelos:
+        return None
+    modelos_ordenados = sorted(modelos, key=lambda x: x['name'])
+    return {
+        "codigos": {m["name"]: m["code"] for m in modelos_ordenados},
+        "indice": IndicePrefixo(m["name"] for m in modelos_ordenados),
+    }
+
+
+@memorizar("fipe", ttl=TTL_CATALOGO)
+def opcoes_anos(tipo, cod_marca, cod_modelo):
+    anos = requisitar_dados(f"{caminho_v2(tipo)}/brands/{cod_marca}/models/{cod_modelo}/years")
+    if not anos:
         return None
+    return {"opcoes": [""] + [a["name"] for a in anos], "codigos": {a["name"]: a["code"] for a in anos}}
+
+
+@memorizar("fipe", ttl=TTL_CATALOGO)
+def filtrar_modelos(tipo, cod_marca, texto):
+    # Cada texto digitado também fica em memória: repetir o filtro num rerun não refaz a busca
+    encontrados = opcoes_modelos(tipo, cod_marca)["indice"].buscar(texto)
+    return {"opcoes": [""] + encontrados[:LIMITE_OPCOES_MODELO], "total": len(encontrados)}
+
+
+@memorizar("fipe", ttl=TTL_PRECO)
+def consultar_preco_por_referencia(cod_marca, cod_modelo, cod_ano, mes, tipo=TIPO_PADRAO):
+    # Pelo seletor de fontes: a v2 responde e, se falhar ou a cota acabar, a API oficial
+    veiculo = VeiculoFipe(int(cod_marca), int(cod_modelo), str(cod_ano), tipo)
+    preco = obter_seletor().consultar_preco(veiculo, data_do_mes(mes))
+    return preco.preco if preco else None
 
 
 def obter_codigo_por_nome(lista, chave_nome):
@@ -65,9 +107,10 @@ def obter_codigo_por_nome(lista, chave_nome):
     return None
 
 
-@st.cache_data(show_spinner=False)
-def obter_historico_veiculo(marca, modelo_nome, ano_str):
-    marcas = requisitar_dados("cars/brands")
+@memorizar("fipe", ttl=TTL_CATALOGO)
+def obter_historico_veiculo(marca, modelo_nome, ano_str, tipo=TIPO_PADRAO):
+    caminho = caminho_v2(tipo)
+    marcas = requisitar_dados(f"{caminho}/brands")
     if not marcas:
         st.error("❌ Erro ao obter marcas.")
         return None
@@ -76,7 +119,7 @@ def obter_historico_veiculo(marca, modelo_nome, ano_str):
     if not cod_marca:
         return None
 
-    modelos = requisitar_dados(f"cars/brands/{cod_marca}/models")
+    modelos = requisitar_dados(f"{caminho}/brands/{cod_marca}/models")
     if not modelos:
         st.error("❌ Erro ao obter modelos.")
         return None
@@ -85,7 +128,7 @@ def obter_historico_veiculo(marca, modelo_nome, ano_str):
     if not cod_modelo:
         return None
 
-    anos = requisitar_dados(f"cars/brands/{cod_marca}/models/{cod_modelo}/years")
+    anos = requisitar_dados(f"{caminho}/brands/{cod_marca}/models/{cod_modelo}/years")
     if not anos:
         st.error("❌ Erro ao obter anos para o modelo.")
         return None
@@ -101,26 +144,32 @@ def obter_historico_veiculo(marca, modelo_nome, ano_str):
 
     historico = []
     for ref in referencias[:NUM_MESES + 1]:
-        ref_code = ref["code"]
-        preco_str = consultar_preco_por_referencia(cod_marca, cod_modelo, cod_ano, ref_code)
-        if preco_str:
-            try:
-                preco = float(preco_str.replace("R$", "").replace(".", "").replace(",", "."))
-                historico.append({
-                    "Referência": ref_code,
-                    "Mês": ref["month"],
-                    "Preço (R$)": preco
-                })
-            except:
-                continue
+        preco = consultar_preco_por_referencia(cod_marca, cod_modelo, cod_ano, ref["month"], tipo)
+        if preco is not None:
+            historico.append({
+                "Referência": ref["code"],
+                "Mês": ref["month"],
+                "Preço (R$)": preco
+            })
     if len(historico) < 2:
         return None
 
-    df = pd.DataFrame(historico).sort_values("Referência").reset_index(drop=True)
+    # Ordenado pela data do mês de referência (não pelo código em texto)
+    return adicionar_variacoes(montar_historico(historico))
+
+
+def adicionar_variacoes(df):
+    df = df.copy()
     df["Variação (R$)"] = df["Preço (R$)"].diff()
     df["Variação (%)"] = (df["Preço (R$)"] / df["Preço (R$)"].shift(1) - 1) * 100
-    df = df.iloc[1:].reset_index(drop=True)
-    return df
+    return df.iloc[1:]
+
+
+@memorizar("fipe")
+def ler_historicos_fixos(versao):
+    # Só o armazém local (atualizado pelo worker_fipe.py); `versao` muda a cada escrita
+    fixos = ler_fixos([(marca, modelo, ano) for _, marca, modelo, ano in VEICULOS_FIXOS], NUM_MESES + 1)
+    return [adicionar_variacoes(df) if df is not None else None for *_, df in fixos]
 
 
 def calcular_variacao_percentual(df):
@@ -154,11 +203,12 @@ def exibir_historico(df, veiculo_nome=None):
 
     with col2:
         st.markdown("### 📈 Evolução dos Preços")
-        fig = px.line(df, x="Mês", y="Preço (R$)", markers=True,
+        fig = px.line(df, x=df.index, y="Preço (R$)", markers=True, hover_data=["Mês"],
                       title=f"Histórico de Preços FIPE – Últimos {NUM_MESES} meses" + (
                           f" - {veiculo_nome}" if veiculo_nome else ""))
         fig.update_layout(
             xaxis_title="Mês de Referência",
+            xaxis_tickformat="%m/%Y",
             yaxis_title="Preço (R$)",
             yaxis_range=[df["Preço (R$)"].min() * 0.75, df["Preço (R$)"].max() * 1.25],
             hovermode="x unified"
@@ -221,85 +271,72 @@ def exibir_comparacao_veiculos(veiculos_comparacao, df_veiculo_buscado=None, vei
 
 
 def carregar_veiculos_fixos():
-    veiculos_fixos = [
-        ("Toyota Corolla XEi 2.0 Flex (2012)", "Toyota", "Corolla XEi 2.0 Flex 16V Aut.", 2012),
-        ("Nissan Sentra SL 2.0 Flex (2016)", "Nissan", "Sentra SL 2.0/ 2.0 Flex Fuel 16V Aut.", 2016),
-        ("Honda Civic Sed. LXL 1.8 Flex (2013)", "Honda", "Civic Sed. LXL/ LXL SE 1.8 Flex 16V Aut.", 2013),
-        ("Hyundai ix35 GLS 2.0 Flex (2012)", "Hyundai", "ix35 GLS 2.0 16V 2WD Flex Aut.", 2012),
-        ("Hyundai Santa Fe 3.3 V6 (2012)", "Hyundai", "Santa Fe/GLS 3.3 V6 4X4 Tiptronic", 2012),
-        ("Kia Sportage EX 2.0 Flex (2012)", "Kia Motors", "Sportage EX 2.0 16V/ 2.0 16V Flex Aut.", 2012),
-    ]
-
-    progresso = st.progress(0, text="Carregando veículos de referência...")
+    # Stale-while-revalidate: mostra o que já está no armazém e, se estiver velho, atualiza em segundo plano
+    revalidar_se_necessario()
     veiculos_comparacao = []
-    total = len(veiculos_fixos)
-
-    for i, (nome, marca, modelo, ano) in enumerate(veiculos_fixos):
-        progresso.progress((i + 1) / total, text=f"Carregando {nome}...")
-        try:
-            df = obter_historico_veiculo(marca, modelo, ano)
-            if df is not None:
-                veiculos_comparacao.append((nome, df))
-            else:
-                st.warning(f"❌ Histórico não encontrado para {nome}")
-                print(f"[NULO] {nome} - marca: {marca} / modelo: {modelo} / ano: {ano}")
-        except Exception as e:
-            st.warning(f"❌ Erro ao carregar {nome}: {str(e)}")
-            print(f"[ERRO] {nome} - marca: {marca} / modelo: {modelo} / ano: {ano} → {str(e)}")
-
-        time.sleep(0.8)  # ⏱️ pausa para evitar bloqueios entre chamadas
-
-    progresso.empty()
-    return veiculos_comparacao, veiculos_fixos
+    for (nome, marca, modelo, ano), df in zip(VEICULOS_FIXOS, ler_historicos_fixos(versao_armazem())):
+        if df is not None:
+            veiculos_comparacao.append((nome, df))
+        else:
+            st.info(f"⏳ Histórico de {nome} ainda não está no armazém local; a atualização roda em segundo plano.")
+            print(f"[PENDENTE] {nome} - marca: {marca} / modelo: {modelo} / ano: {ano}")
+    return veiculos_comparacao, VEICULOS_FIXOS
 
 
 def main():
     st.set_page_config(page_title="FIPE – Histórico de Preço", layout="wide")
     st.title(f"🚗 Consulta Tabela FIPE – Últimos {NUM_MESES} Meses")
+    with st.sidebar.expander("📦 Cache em memória"):
+        st.json(obter_cache("fipe").resumo())
+    with st.sidebar.expander("📊 Cota FIPE de hoje"):
+        st.json(obter_cliente("fipe_v2").agendador.resumo())
 
     # 🔍 Buscador de veículos - exibido antes dos fixos
     st.markdown("### 🔍 Buscar Veículo")
 
-    marcas = requisitar_dados("cars/brands")
+    tipo = st.radio("🚙 Tipo de veículo:", list(TIPOS_VEICULO), horizontal=True,
+                    format_func=lambda t: TIPOS_VEICULO[t]["rotulo"])
+    marcas = opcoes_marcas(tipo)
     if not marcas:
         st.stop()
 
-    marcas_ordenadas = ordenar_marcas_por_relevancia(marcas)
-    nome_para_codigo = {f"{m['name']} (cód: {m['code']})": m['code'] for m in marcas_ordenadas}
-    marca_escolhida = st.selectbox("📌 Selecione uma marca:", [""] + list(nome_para_codigo.keys()), index=0)
+    marca_escolhida = st.selectbox("📌 Selecione uma marca:", marcas["opcoes"], index=0)
 
     df_veiculo_buscado = None
     veiculo_buscado_nome = None
 
     if marca_escolhida:
-        cod_marca = nome_para_codigo[marca_escolhida]
-        modelos = requisitar_dados(f"cars/brands/{cod_marca}/models")
+        cod_marca = marcas["codigos"][marca_escolhida]
+        modelos = opcoes_modelos(tipo, cod_marca)
         if not modelos:
             st.warning("⚠️ Nenhum modelo disponível para esta marca.")
             st.stop()
 
-        modelos_ordenados = sorted(modelos, key=lambda x: x['name'])
-        nome_para_modelo = {m["name"]: m["code"] for m in modelos_ordenados}
-        modelo_selecionado = st.selectbox("📋 Selecione o modelo:", [""] + list(nome_para_modelo.keys()), index=0)
+        texto_modelo = st.text_input("🔎 Filtrar modelos (digite partes do nome, ex.: 'cor xei 2.0'):")
+        filtrados = filtrar_modelos(tipo, cod_marca, texto_modelo)
+        if filtrados["total"] > LIMITE_OPCOES_MODELO:
+            st.caption(f"Mostrando {LIMITE_OPCOES_MODELO} de {filtrados['total']} modelos; digite para refinar.")
+        modelo_selecionado = st.selectbox("📋 Selecione o modelo:", filtrados["opcoes"], index=0)
 
         if modelo_selecionado:
-            cod_modelo = nome_para_modelo[modelo_selecionado]
-            anos = requisitar_dados(f"cars/brands/{cod_marca}/models/{cod_modelo}/years")
+            cod_modelo = modelos["codigos"][modelo_selecionado]
+            anos = opcoes_anos(tipo, cod_marca, cod_modelo)
             if not anos:
                 st.warning("⚠️ Nenhum ano disponível para este modelo.")
                 st.stop()
 
-            nome_para_ano = {a["name"]: a["code"] for a in anos}
-            ano_escolhido = st.selectbox("📅 Selecione o ano:", [""] + list(nome_para_ano.keys()), index=0)
+            ano_escolhido = st.selectbox("📅 Selecione o ano:", anos["opcoes"], index=0)
 
             if ano_escolhido:
-                veiculo_buscado_nome = f"{marca_escolhida.split(' (')[0]} {modelo_selecionado} ({ano_escolhido.split(' ')[0]})"
+                nome_marca = marcas["nomes"][marca_escolhida]
+                veiculo_buscado_nome = f"{nome_marca} {modelo_selecionado} ({ano_escolhido.split(' ')[0]})"
 
                 with st.spinner(f'Buscando dados para {veiculo_buscado_nome}...'):
                     df_veiculo_buscado = obter_historico_veiculo(
-                        marca_escolhida.split(' (')[0],
+                        nome_marca,
                         modelo_selecionado,
-                        ano_escolhido.split(' ')[0]
+                        ano_escolhido.split(' ')[0],
+                        tipo
                     )
 
                 if df_veiculo_buscado is not None:
@@ -308,15 +345,11 @@ def main():
                 else:
                     st.warning("⚠️ Nenhum histórico de preço disponível para esse veículo.")
 
-    # 💤 Aguarda brevemente antes de carregar veículos fixos
-    time.sleep(0.8)
-
     # 🚘 Veículos fixos
     st.markdown("---")
     st.markdown("### 🔍 Veículos de Referência (Histórico Completo)")
 
-    with st.spinner('Carregando dados de referência...'):
-        veiculos_comparacao, veiculos_fixos = carregar_veiculos_fixos()
+    veiculos_comparacao, veiculos_fixos = carregar_veiculos_fixos()
 
     if veiculos_comparacao:
         # Comparação agora inclui o veículo buscado, se houver
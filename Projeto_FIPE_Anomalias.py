@@ -0,0 +1,62 @@
+import pandas as pd
+import streamlit as st
+import plotly.express as px
+
+from anomalias_fipe import detectar_anomalias, JANELA, Z_LIMITE, SALTO_MINIMO
+from armazem_fipe import carregar_historicos, matriz_precos, ARQUIVO_HISTORICOS
+from worker_fipe import versao_armazem
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def obter_matriz(versao):
+    # versao_armazem() na chave: cada mesclagem do worker gera uma matriz nova
+    historicos = carregar_historicos()
+    if historicos.empty:
+        return None
+    return matriz_precos(historicos)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def obter_anomalias(versao, janela, z_limite, salto_minimo):
+    veiculos, datas, precos = obter_matriz(versao)
+    return detectar_anomalias(veiculos, datas, precos, janela, z_limite, salto_minimo)
+
+
+def main():
+    st.set_page_config(page_title="FIPE – Anomalias de Preço", layout="wide")
+    st.title("🚨 FIPE – Saltos Anormais de Preço")
+
+    versao = versao_armazem()
+    if obter_matriz(versao) is None:
+        st.warning(f"⚠️ Nenhum histórico em '{ARQUIVO_HISTORICOS}'. Importe exportações com 'python armazem_fipe.py <arquivo>'.")
+        st.stop()
+    veiculos, datas, precos = obter_matriz(versao)
+    st.caption(f"{len(veiculos)} veículos × {len(datas)} meses ({datas.min():%m/%Y} a {datas.max():%m/%Y})")
+
+    col1, col2, col3 = st.columns(3)
+    janela = col1.slider("Janela do z-score (meses)", 3, 24, JANELA)
+    z_limite = col2.slider("Z-score mínimo", 1.5, 6.0, Z_LIMITE, step=0.5)
+    salto_minimo = col3.slider("Mudança de nível mínima (%)", 1, 30, int(SALTO_MINIMO * 100)) / 100
+
+    anomalias = obter_anomalias(versao, janela, z_limite, salto_minimo)
+    st.markdown(f"### 📋 {len(anomalias)} anomalias encontradas")
+    top = anomalias.head(100)
+    st.dataframe(top, use_container_width=True, hide_index=True)
+
+    if top.empty:
+        return
+    rotulos = [f"{r.marca} {r.modelo} ({r.ano_modelo}) – {r.Mês:%m/%Y}" for r in top.itertuples()]
+    escolhido = st.selectbox("🔍 Ver histórico:", range(len(rotulos)), format_func=lambda i: rotulos[i])
+    linha = top.iloc[escolhido]
+    chave = (veiculos["tipo_veiculo"] == linha["tipo_veiculo"]) & (veiculos["codigo_marca"] == linha["codigo_marca"]) \
+        & (veiculos["codigo_modelo"] == linha["codigo_modelo"]) & (veiculos["codigo_ano"] == linha["codigo_ano"])
+    serie = pd.Series(precos[chave.to_numpy().argmax()], index=datas, name="Preço (R$)").dropna()
+
+    fig = px.line(serie, markers=True, title=rotulos[escolhido])
+    fig.add_vline(x=linha["Mês"], line_dash="dash", line_color="red")
+    fig.update_layout(xaxis_title="Mês de Referência", xaxis_tickformat="%m/%Y", yaxis_title="Preço (R$)", showlegend=False)
+    st.plotly_chart(fig, use_container_width=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,26 @@
-import os
-import requests
-import dotenv
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 import pandas as pd
 from tqdm import tqdm
 
-# Carrega a chave da API
-dotenv.load_dotenv()
-TOKEN = os.getenv("CHAVE_API_FIPE")
+from cliente_api import obter_cliente
+from cota_api import com_prioridade_atual, definir_prioridade_padrao
+from depreciacao_fipe import carregar_indice, ranking_familias
+from tipos_veiculo import TIPOS_VEICULO, caminho_v2
 
-HEADERS = {
-    "accept": "application/json",
-    "X-Subscription-Token": TOKEN
-}
-URL_BASE = "https://fipe.parallelum.com.br/api/v2"
 NUM_MESES = 12
 
-# Marcas a analisar
-PRIORITARIAS = ["Nissan"]
+# Marcas a analisar, por tipo de veículo
+PRIORITARIAS = {
+    "carros": ["Nissan"],
+    "motos": ["Honda", "Yamaha"],
+    "caminhoes": ["Volvo", "Scania"],
+}
 
 # Funções auxiliares
 def requisitar_dados(endpoint, parametros=None):
-    try:
-        resposta = requests.get(f"{URL_BASE}/{endpoint}", headers=HEADERS, params=parametros)
-        resposta.raise_for_status()
-        return resposta.json()
-    except requests.HTTPError:
-        return None
+    # Erros de conexão/timeout também viram None: não derrubam a varredura
+    return obter_cliente("fipe_v2").obter_json(endpoint, parametros)
 
 def obter_codigo_por_nome(lista, chave_nome):
     if not lista:
@@ -35,25 +30,22 @@ def obter_codigo_por_nome(lista, chave_nome):
             return item['code']
     return None
 
-def consultar_preco_por_referencia(cod_marca, cod_modelo, cod_ano, ref_code):
-    url = f"{URL_BASE}/cars/brands/{cod_marca}/models/{cod_modelo}/years/{cod_ano}"
-    params = {"reference": ref_code}
-    resposta = requests.get(url, headers=HEADERS, params=params)
-    if resposta.status_code == 200:
-        dados = resposta.json()
-        return dados.get("price", None)
-    return None
+def consultar_preco_por_referencia(tipo, cod_marca, cod_modelo, cod_ano, ref_code):
+    endpoint = f"{caminho_v2(tipo)}/brands/{cod_marca}/models/{cod_modelo}/years/{cod_ano}"
+    dados = requisitar_dados(endpoint, {"reference": ref_code})
+    return dados.get("price", None) if dados else None
 
-def obter_historico(marca, modelo, ano):
-    cod_marca = obter_codigo_por_nome(requisitar_dados("cars/brands"), marca)
+def obter_historico(tipo, marca, modelo, ano):
+    caminho = caminho_v2(tipo)
+    cod_marca = obter_codigo_por_nome(requisitar_dados(f"{caminho}/brands"), marca)
     if not cod_marca:
         return None
 
-    cod_modelo = obter_codigo_por_nome(requisitar_dados(f"cars/brands/{cod_marca}/models"), modelo)
+    cod_modelo = obter_codigo_por_nome(requisitar_dados(f"{caminho}/brands/{cod_marca}/models"), modelo)
     if not cod_modelo:
         return None
 
-    anos = requisitar_dados(f"cars/brands/{cod_marca}/models/{cod_modelo}/years")
+    anos = requisitar_dados(f"{caminho}/brands/{cod_marca}/models/{cod_modelo}/years")
     if not anos:
         return None
 
@@ -61,10 +53,10 @@ def obter_historico(marca, modelo, ano):
     if not cod_ano:
         return None
 
-    referencias = requisitar_dados("references")[:NUM_MESES + 1]
+    referencias = (requisitar_dados("references") or [])[:NUM_MESES + 1]
     historico = []
     for ref in referencias:
-        preco_str = consultar_preco_por_referencia(cod_marca, cod_modelo, cod_ano, ref["code"])
+        preco_str = consultar_preco_por_referencia(tipo, cod_marca, cod_modelo, cod_ano, ref["code"])
         if preco_str:
             try:
                 preco = float(preco_str.replace("R$", "").replace(".", "").replace(",", "."))
@@ -73,28 +65,24 @@ def obter_historico(marca, modelo, ano):
                 continue
     return historico if len(historico) >= 2 else None
 
-# Execução principal
-if __name__ == "__main__":
-    ano_input = input("Digite o ano do veículo para varredura (ex: 2012): ").strip()
-    try:
-        ano_filtrado = int(ano_input)
-        if not (2006 <= ano_filtrado <= 2016):
-            raise ValueError("Ano fora do intervalo permitido.")
-    except ValueError:
-        print("Ano inválido. Informe um ano entre 2006 e 2016.")
-        exit()
-
-    marcas = requisitar_dados("cars/brands")
-    marcas = [m for m in marcas if any(p.lower() in m['name'].lower() for p in PRIORITARIAS)]
+def modelos_priorizados(tipo):
+    caminho = caminho_v2(tipo)
+    marcas = requisitar_dados(f"{caminho}/brands") or []
+    marcas = [m for m in marcas if any(p.lower() in m['name'].lower() for p in PRIORITARIAS[tipo])]
+    return [(marca, requisitar_dados(f"{caminho}/brands/{marca['code']}/models") or []) for marca in marcas]
 
+def ranquear_tipo(tipo, modelos_por_marca, ano_filtrado, agendador, posicao=0):
+    # Uma varredura por tipo; todas dividem o mesmo cliente (limitador de taxa, cache e cota)
     resultados = []
-
-    for marca in tqdm(marcas, desc="🔍 Processando marcas"):
-        modelos = requisitar_dados(f"cars/brands/{marca['code']}/models")
-        if not modelos:
+    rotulo = TIPOS_VEICULO[tipo]["rotulo"]
+    for marca, modelos in modelos_por_marca:
+        if not modelos or agendador.disponiveis() <= 0:
             continue
-        for modelo in tqdm(modelos, leave=False, desc=f"Modelos {marca['name']}"):
-            historico = obter_historico(marca['name'], modelo['name'], ano_filtrado)
+        for modelo in tqdm(modelos, position=posicao, leave=False, desc=f"{rotulo} {marca['name']}"):
+            if agendador.disponiveis() <= 0:
+                print(f"\n⛔ Fatia da cota diária do lote esgotada ({rotulo}); salvando o que já foi processado.")
+                break
+            historico = obter_historico(tipo, marca['name'], modelo['name'], ano_filtrado)
             if historico and len(historico) >= 2:
                 preco_inicial = historico[-1]
                 preco_final = historico[0]
@@ -102,6 +90,7 @@ if __name__ == "__main__":
                 percentual = (variacao / preco_inicial) * 100
 
                 resultados.append({
+                    "Tipo": rotulo,
                     "Marca": marca['name'],
                     "Modelo": modelo['name'],
                     "Ano": ano_filtrado,
@@ -112,6 +101,60 @@ if __name__ == "__main__":
                     "Variação R$": round(variacao, 2),
                     "Variação %": round(percentual, 2)
                 })
+    return resultados
+
+# Execução principal
+if __name__ == "__main__":
+    ano_input = input("Digite o ano do veículo para varredura (ex: 2012): ").strip()
+    try:
+        ano_filtrado = int(ano_input)
+        if not (2006 <= ano_filtrado <= 2016):
+            raise ValueError("Ano fora do intervalo permitido.")
+    except ValueError:
+        print("Ano inválido. Informe um ano entre 2006 e 2016.")
+        exit()
+
+    tipos_input = input(f"Tipos de veículo ({', '.join(TIPOS_VEICULO)}; Enter = todos): ").strip()
+    tipos = [t.strip() for t in tipos_input.split(",") if t.strip()] or list(TIPOS_VEICULO)
+    if any(t not in TIPOS_VEICULO for t in tipos):
+        print(f"Tipo inválido. Use: {', '.join(TIPOS_VEICULO)}.")
+        exit()
+
+    # Resposta instantânea pelo índice pré-calculado, se existir; a varredura completa fica opcional
+    indice = carregar_indice()
+    if indice is not None:
+        for tipo in tipos:
+            for marca in PRIORITARIAS[tipo]:
+                ranking = ranking_familias(indice, marca, date.today().year - ano_filtrado, NUM_MESES, tipo)
+                if not ranking.empty:
+                    print(f"\n📉 Depreciação média em {NUM_MESES} meses — {marca} {ano_filtrado} "
+                          f"({TIPOS_VEICULO[tipo]['rotulo']}, índice):")
+                    print(ranking.to_string(index=False))
+        if input("\nFazer a varredura completa na API mesmo assim? (s/N): ").strip().lower() != "s":
+            exit()
+
+    # Varredura em lote: cede a vez aos usuários interativos e não passa da fatia da cota reservada ao lote
+    definir_prioridade_padrao("lote")
+    agendador = obter_cliente("fipe_v2").agendador
+
+    with ThreadPoolExecutor(max_workers=len(tipos)) as executor:
+        modelos_por_tipo = dict(zip(tipos, executor.map(com_prioridade_atual(modelos_priorizados), tipos)))
+
+    # Por modelo: anos + referências + um preço por mês (pior caso, sem acertos de cache)
+    estimativa = sum(len(modelos) for por_marca in modelos_por_tipo.values() for _, modelos in por_marca) * (NUM_MESES + 3)
+    projecao = agendador.projetar(estimativa)
+    print(f"📊 Cota FIPE hoje: {projecao['consumidas_hoje']}/{projecao['cota_diaria']} usadas; "
+          f"a varredura precisa de até {estimativa} e o lote ainda tem {projecao['disponiveis']}.")
+    if not projecao["cabe"] and input("⚠️ Não cabe na cota de hoje. Rodar até onde der? (s/N): ").strip().lower() != "s":
+        exit()
+
+    # Os tipos rodam ao mesmo tempo em vez de três execuções seguidas do script
+    with ThreadPoolExecutor(max_workers=len(tipos)) as executor:
+        futuros = [
+            executor.submit(com_prioridade_atual(ranquear_tipo), tipo, modelos_por_tipo[tipo], ano_filtrado, agendador, posicao)
+            for posicao, tipo in enumerate(tipos)
+        ]
+        resultados = [linha for futuro in futuros for linha in futuro.result()]
 
     df_resultado = pd.DataFrame(resultados)
 
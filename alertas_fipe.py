@@ -0,0 +1,341 @@
+import argparse
+import contextlib
+import json
+import os
+import sqlite3
+import sys
+import time
+import numpy as np
+import pandas as pd
+import requests
+
+from armazem_fipe import CHAVE_VEICULO, carregar_historicos, matriz_precos
+from tipos_veiculo import TIPO_PADRAO, TIPOS_VEICULO, codigo_oficial, tipo_por_codigo
+
+ARQUIVO_ALERTAS = os.path.join("dados", "alertas_fipe.db")
+ARQUIVO_SAIDA = os.path.join("dados", "alertas_fipe.jsonl")
+# Saídas além do registro em SQLite (que é sempre feito e evita alerta repetido): "arquivo", "webhook"
+SAIDAS = os.getenv("ALERTAS_SAIDAS", "arquivo")
+WEBHOOK = os.getenv("ALERTAS_WEBHOOK")  # sem URL, o webhook só mostra o que enviaria
+
+COLUNAS_ALERTA = ["acompanhamento", "usuario", "marca", "modelo", *CHAVE_VEICULO, "data_referencia", "regra",
+                  "preco", "preco_anterior", "variacao_pct", "limite"]
+
+
+@contextlib.contextmanager
+def conectar(caminho=ARQUIVO_ALERTAS):
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    conexao = sqlite3.connect(caminho, timeout=10, isolation_level=None)
+    try:
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.executescript("""
+            CREATE TABLE IF NOT EXISTS acompanhamentos (
+                id INTEGER PRIMARY KEY, usuario TEXT NOT NULL, marca TEXT, modelo TEXT,
+                tipo_veiculo INTEGER NOT NULL, codigo_marca INTEGER NOT NULL,
+                codigo_modelo INTEGER NOT NULL, codigo_ano TEXT NOT NULL,
+                queda_pct REAL, preco_maximo REAL, criado_em REAL,
+                UNIQUE (usuario, tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano)
+            );
+            CREATE TABLE IF NOT EXISTS alertas (
+                acompanhamento INTEGER, data_referencia TEXT, regra TEXT,
+                preco REAL, variacao_pct REAL, emitido_em REAL,
+                PRIMARY KEY (acompanhamento, data_referencia, regra)
+            );
+        """)
+        yield conexao
+    finally:
+        conexao.close()
+
+
+# --- Lista de acompanhamento
+
+def acompanhar_varios(acompanhamentos, caminho=ARQUIVO_ALERTAS):
+    # DataFrame com usuario, marca, modelo, CHAVE_VEICULO, queda_pct e preco_maximo; repetir o veículo atualiza os limites
+    linhas = acompanhamentos.reindex(columns=["usuario", "marca", "modelo", *CHAVE_VEICULO, "queda_pct", "preco_maximo"])
+    linhas = linhas.astype(object).where(linhas.notna(), None)
+    agora = time.time()
+    with conectar(caminho) as conexao:
+        conexao.execute("BEGIN")
+        conexao.executemany(
+            "INSERT INTO acompanhamentos (usuario, marca, modelo, tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano, "
+            "queda_pct, preco_maximo, criado_em) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (usuario, tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano) DO UPDATE SET "
+            "queda_pct = excluded.queda_pct, preco_maximo = excluded.preco_maximo",
+            [(*linha, agora) for linha in linhas.itertuples(index=False, name=None)],
+        )
+        conexao.execute("COMMIT")
+    return len(linhas)
+
+
+def acompanhar(veiculo, queda_pct=None, preco_maximo=None, usuario="padrao", caminho=ARQUIVO_ALERTAS):
+    # veiculo no formato do catálogo: Tipo, Marca, Código Marca, Modelo, Código Modelo, Ano, Código Ano
+    if queda_pct is None and preco_maximo is None:
+        raise ValueError("informe ao menos um limite: queda_pct ou preco_maximo")
+    return acompanhar_varios(pd.DataFrame([{
+        "usuario": usuario,
+        "marca": veiculo["Marca"],
+        "modelo": veiculo["Modelo"],
+        "tipo_veiculo": codigo_oficial(veiculo.get("Tipo", TIPO_PADRAO)),
+        "codigo_marca": int(veiculo["Código Marca"]),
+        "codigo_modelo": int(veiculo["Código Modelo"]),
+        "codigo_ano": str(veiculo["Código Ano"]),
+        "queda_pct": queda_pct,
+        "preco_maximo": preco_maximo,
+    }]), caminho)
+
+
+def deixar_de_acompanhar(ids, caminho=ARQUIVO_ALERTAS):
+    with conectar(caminho) as conexao:
+        return conexao.executemany("DELETE FROM acompanhamentos WHERE id = ?", [(int(i),) for i in ids]).rowcount
+
+
+def carregar_acompanhamentos(caminho=ARQUIVO_ALERTAS):
+    with conectar(caminho) as conexao:
+        acompanhamentos = pd.read_sql_query("SELECT * FROM acompanhamentos ORDER BY id", conexao)
+    return acompanhamentos.astype({"queda_pct": "float64", "preco_maximo": "float64"})
+
+
+def veiculos_acompanhados(caminho=ARQUIVO_ALERTAS):
+    # Veículos distintos da lista, no formato que o worker usa para baixar os meses que faltam
+    acompanhamentos = carregar_acompanhamentos(caminho).drop_duplicates(CHAVE_VEICULO)
+    return [
+        {"Tipo": tipo_por_codigo(a.tipo_veiculo), "Código Marca": int(a.codigo_marca),
+         "Código Modelo": int(a.codigo_modelo), "Código Ano": a.codigo_ano, "Marca": a.marca, "Modelo": a.modelo}
+        for a in acompanhamentos.itertuples(index=False)
+    ]
+
+
+# --- Avaliação
+
+def avaliar(acompanhamentos, veiculos, datas, precos, data_referencia=None):
+    # Todas as entradas de uma vez sobre a matriz do armazém: cada entrada vira um índice de linha e
+    # as regras são comparações de arrays. Avalia o mês pedido (padrão: o mais recente) contra o anterior.
+    if acompanhamentos.empty or not len(datas):
+        return pd.DataFrame(columns=COLUNAS_ALERTA)
+    coluna = len(datas) - 1 if data_referencia is None else datas.get_loc(pd.Timestamp(data_referencia))
+
+    chaves = pd.MultiIndex.from_frame(veiculos[CHAVE_VEICULO].astype(
+        {"tipo_veiculo": "int64", "codigo_marca": "int64", "codigo_modelo": "int64", "codigo_ano": str}))
+    procurados = pd.MultiIndex.from_frame(acompanhamentos[CHAVE_VEICULO].astype(
+        {"tipo_veiculo": "int64", "codigo_marca": "int64", "codigo_modelo": "int64", "codigo_ano": str}))
+    linhas = chaves.get_indexer(procurados)
+    no_armazem = linhas >= 0
+    linhas = np.where(no_armazem, linhas, 0)
+
+    preco = np.where(no_armazem, precos[linhas, coluna], np.nan)
+    anterior = np.where(no_armazem, precos[linhas, coluna - 1], np.nan) if coluna > 0 else np.full(len(linhas), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variacao = (preco / anterior - 1) * 100
+    queda_pct = acompanhamentos["queda_pct"].to_numpy(dtype="float64")
+    preco_maximo = acompanhamentos["preco_maximo"].to_numpy(dtype="float64")
+
+    # Comparações com NaN (sem preço no mês ou regra não configurada) dão False
+    disparos = {
+        "queda_mensal": (variacao <= -queda_pct, queda_pct),
+        "abaixo_de": (preco <= preco_maximo, preco_maximo),
+    }
+    partes = []
+    for regra, (mascara, limite) in disparos.items():
+        posicoes = np.flatnonzero(mascara)
+        if not len(posicoes):
+            continue
+        parte = acompanhamentos.iloc[posicoes][["id", "usuario", "marca", "modelo", *CHAVE_VEICULO]].rename(
+            columns={"id": "acompanhamento"})
+        parte["data_referencia"] = datas[coluna]
+        parte["regra"] = regra
+        parte["preco"] = preco[posicoes]
+        parte["preco_anterior"] = anterior[posicoes]
+        parte["variacao_pct"] = np.round(variacao[posicoes], 2)
+        parte["limite"] = limite[posicoes]
+        partes.append(parte)
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS_ALERTA)
+    return pd.concat(partes, ignore_index=True)[COLUNAS_ALERTA]
+
+
+def registrar_novos(alertas, caminho=ARQUIVO_ALERTAS):
+    # O registro em SQLite é a saída permanente e a deduplicação: alerta já emitido para o mês não volta
+    if alertas.empty:
+        return alertas
+    datas = alertas["data_referencia"].dt.strftime("%Y-%m-%d")
+    with conectar(caminho) as conexao:
+        emitidos = pd.read_sql_query(
+            f"SELECT acompanhamento, data_referencia, regra FROM alertas "
+            f"WHERE data_referencia IN ({','.join('?' * datas.nunique())})",
+            conexao, params=list(datas.unique()),
+        )
+        chaves = pd.MultiIndex.from_arrays([alertas["acompanhamento"], datas, alertas["regra"]])
+        novos = alertas[~chaves.isin(pd.MultiIndex.from_frame(emitidos))]
+        agora = time.time()
+        conexao.execute("BEGIN")
+        conexao.executemany(
+            "INSERT OR IGNORE INTO alertas VALUES (?, ?, ?, ?, ?, ?)",
+            [(int(a), d, r, float(p), None if pd.isna(v) else float(v), agora) for a, d, r, p, v in zip(
+                novos["acompanhamento"], datas[novos.index], novos["regra"], novos["preco"], novos["variacao_pct"])],
+        )
+        conexao.execute("COMMIT")
+    return novos.reset_index(drop=True)
+
+
+# --- Saídas
+
+def _registros(alertas):
+    registros = alertas.assign(data_referencia=alertas["data_referencia"].dt.strftime("%Y-%m-%d"))
+    registros = registros.astype(object).where(registros.notna(), None)
+    return registros.to_dict("records")
+
+
+class SaidaArquivo:
+    # Uma linha JSON por alerta, acumulando entre execuções
+
+    def __init__(self, caminho=ARQUIVO_SAIDA):
+        self.caminho = caminho
+
+    def emitir(self, alertas):
+        os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+        with open(self.caminho, "a", encoding="utf-8") as arquivo:
+            for registro in _registros(alertas):
+                arquivo.write(json.dumps(registro, ensure_ascii=False, default=int) + "\n")
+
+
+class SaidaWebhook:
+    # Um POST por lote; sem URL configurada é só um esboço que mostra o que seria enviado
+
+    def __init__(self, url=WEBHOOK, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def emitir(self, alertas):
+        corpo = {"alertas": _registros(alertas)}
+        if not self.url:
+            print(f"📨 [webhook sem URL] enviaria {len(corpo['alertas'])} alertas")
+            return
+        try:
+            requests.post(self.url, data=json.dumps(corpo, ensure_ascii=False, default=int),
+                          headers={"Content-Type": "application/json"}, timeout=self.timeout).raise_for_status()
+        except requests.RequestException as e:
+            # Alerta já ficou registrado no SQLite; falha do webhook não derruba a atualização
+            print(f"⚠️ Webhook de alertas falhou: {e}")
+
+
+SAIDAS_DISPONIVEIS = {"arquivo": SaidaArquivo, "webhook": SaidaWebhook}
+
+
+def criar_saidas(nomes=SAIDAS):
+    return [SAIDAS_DISPONIVEIS[nome.strip()]() for nome in nomes.split(",") if nome.strip()]
+
+
+def processar_alertas(historicos=None, saidas=None, caminho=ARQUIVO_ALERTAS):
+    # Chamado pelo worker depois de cada mesclagem no armazém
+    acompanhamentos = carregar_acompanhamentos(caminho)
+    if acompanhamentos.empty:
+        return pd.DataFrame(columns=COLUNAS_ALERTA)
+    historicos = carregar_historicos() if historicos is None else historicos
+    if historicos.empty:
+        return pd.DataFrame(columns=COLUNAS_ALERTA)
+    novos = registrar_novos(avaliar(acompanhamentos, *matriz_precos(historicos)), caminho)
+    if not novos.empty:
+        for saida in criar_saidas() if saidas is None else saidas:
+            saida.emitir(novos)
+    return novos
+
+
+# --- Linha de comando
+
+def resolver_no_catalogo(catalogo, lista):
+    # Casamento exato por nome (Marca;Modelo;Ano[;Tipo]) com o catálogo local, sem chamar a API
+    lista = lista.assign(Tipo=lista["Tipo"].fillna(TIPO_PADRAO) if "Tipo" in lista else TIPO_PADRAO,
+                         Ano=lista["Ano"].astype(int))
+    return lista.merge(catalogo.drop_duplicates(["Tipo", "Marca", "Modelo", "Ano"]),
+                       on=["Tipo", "Marca", "Modelo", "Ano"], how="left")
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Lista de acompanhamento de veículos FIPE com alertas de preço.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    novo = sub.add_parser("acompanhar", help="acompanha um veículo do catálogo local")
+    novo.add_argument("marca")
+    novo.add_argument("modelo", help="trecho do nome do modelo")
+    novo.add_argument("ano", type=int)
+    novo.add_argument("--tipo", choices=sorted(TIPOS_VEICULO), default=TIPO_PADRAO)
+    novo.add_argument("--queda", type=float, help="alerta se o preço cair mais que X%% no mês")
+    novo.add_argument("--abaixo", type=float, help="alerta se o preço ficar abaixo de R$ X")
+    novo.add_argument("--usuario", default="padrao")
+
+    importar = sub.add_parser("importar", help="importa um CSV Marca;Modelo;Ano[;Tipo;Queda %%;Preço Máximo]")
+    importar.add_argument("arquivo")
+    importar.add_argument("--queda", type=float, help="limite padrão para linhas sem 'Queda %%'")
+    importar.add_argument("--abaixo", type=float, help="limite padrão para linhas sem 'Preço Máximo'")
+    importar.add_argument("--usuario", default="padrao")
+
+    sub.add_parser("listar", help="mostra a lista de acompanhamento")
+    remover = sub.add_parser("remover", help="remove acompanhamentos pelo id")
+    remover.add_argument("ids", type=int, nargs="+")
+    sub.add_parser("avaliar", help="avalia a lista contra o armazém local e emite os alertas novos")
+    return parser
+
+
+def main(argv=None):
+    from catalogo_fipe import carregar_catalogo
+    from exportar_historicos_fipe import selecionar_veiculos
+
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    if args.comando == "acompanhar" and args.queda is None and args.abaixo is None:
+        parser.error("acompanhar: informe ao menos um limite (--queda e/ou --abaixo)")
+    if args.comando in ("acompanhar", "importar"):
+        catalogo = carregar_catalogo()
+        if catalogo is None:
+            print("⚠️ Catálogo local não encontrado. Rode 'python catalogo_fipe.py' antes.")
+            return 1
+
+    if args.comando == "acompanhar":
+        encontrados = selecionar_veiculos(catalogo, args.marca, args.modelo, args.ano, tipos=[args.tipo])
+        if encontrados.empty:
+            print(f"⚠️ {args.marca} {args.modelo} ({args.ano}) não está no catálogo.")
+            return 1
+        if len(encontrados) > 1:
+            print(f"ℹ️ {len(encontrados)} versões encontradas; acompanhando '{encontrados.iloc[0]['Modelo']}'.")
+        acompanhar(encontrados.iloc[0], args.queda, args.abaixo, args.usuario)
+        print("✅ Veículo adicionado à lista de acompanhamento.")
+    elif args.comando == "importar":
+        lista = pd.read_csv(args.arquivo, sep=";", encoding="utf-8-sig")
+        resolvidos = resolver_no_catalogo(catalogo, lista)
+        faltando = resolvidos["Código Marca"].isna()
+        resolvidos = resolvidos[~faltando]
+        quedas = resolvidos["Queda %"] if "Queda %" in resolvidos else pd.Series(np.nan, index=resolvidos.index)
+        maximos = resolvidos["Preço Máximo"] if "Preço Máximo" in resolvidos else pd.Series(np.nan, index=resolvidos.index)
+        novos = pd.DataFrame({
+            "usuario": args.usuario,
+            "marca": resolvidos["Marca"],
+            "modelo": resolvidos["Modelo"],
+            "tipo_veiculo": resolvidos["Tipo"].map(codigo_oficial),
+            "codigo_marca": resolvidos["Código Marca"].astype(int),
+            "codigo_modelo": resolvidos["Código Modelo"].astype(int),
+            "codigo_ano": resolvidos["Código Ano"].astype(str),
+            "queda_pct": quedas.fillna(args.queda) if args.queda is not None else quedas,
+            "preco_maximo": maximos.fillna(args.abaixo) if args.abaixo is not None else maximos,
+        })
+        # Sem nenhum limite (nem na linha nem no padrão da linha de comando) o acompanhamento nunca dispararia
+        sem_limite = novos["queda_pct"].isna() & novos["preco_maximo"].isna()
+        total = acompanhar_varios(novos[~sem_limite])
+        print(f"✅ {total} veículos na lista; {int(faltando.sum())} linhas sem correspondência no catálogo.")
+        if sem_limite.any():
+            print(f"⚠️ {int(sem_limite.sum())} linhas ignoradas sem limite: preencha 'Queda %'/'Preço Máximo' "
+                  "ou use --queda/--abaixo.")
+    elif args.comando == "listar":
+        print(carregar_acompanhamentos().to_string(index=False))
+    elif args.comando == "remover":
+        print(f"🗑️ {deixar_de_acompanhar(args.ids)} acompanhamentos removidos.")
+    elif args.comando == "avaliar":
+        inicio = time.perf_counter()
+        novos = processar_alertas()
+        print(f"🔔 {len(novos)} alertas novos em {time.perf_counter() - inicio:.2f}s")
+        if not novos.empty:
+            print(novos.to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
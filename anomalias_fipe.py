@@ -0,0 +1,69 @@
+import warnings
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+JANELA = 6  # meses anteriores usados como referência para o z-score
+Z_LIMITE = 3.0
+SALTO_MINIMO = 0.05  # variação de nível mínima para um ponto de mudança
+MESES_PERSISTENCIA = 3
+DESVIO_MINIMO = 0.002  # preços FIPE andam em degraus: evita z-scores enormes em séries quase constantes
+
+
+def calcular_retornos(precos):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        retornos = precos[:, 1:] / precos[:, :-1] - 1
+    return np.where(np.isfinite(retornos), retornos, np.nan)
+
+
+def _janelas_anteriores(matriz, janela):
+    # Para cada mês t, os `janela` valores de t-janela até t-1 (NaN onde não há histórico)
+    preenchida = np.concatenate([np.full((matriz.shape[0], janela), np.nan), matriz[:, :-1]], axis=1)
+    return sliding_window_view(preenchida, janela, axis=1)
+
+
+def calcular_zscores(retornos, janela=JANELA):
+    anteriores = _janelas_anteriores(retornos, janela)
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        media = np.nanmean(anteriores, axis=-1)
+        desvio = np.nanstd(anteriores, axis=-1)
+        contagem = np.sum(~np.isnan(anteriores), axis=-1)
+        z = (retornos - media) / np.maximum(desvio, DESVIO_MINIMO)
+    # Sem a janela completa de histórico não há z-score confiável
+    z[contagem < janela] = np.nan
+    return z
+
+
+def detectar_pontos_mudanca(precos, salto_minimo=SALTO_MINIMO, persistencia=MESES_PERSISTENCIA):
+    # Mudança de nível que persiste: média dos próximos `persistencia` meses vs. mês anterior
+    n = precos.shape[1]
+    flags = np.zeros((precos.shape[0], n - 1), dtype=bool)
+    if n <= persistencia:
+        return flags
+    depois = sliding_window_view(precos[:, 1:], persistencia, axis=1)
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        nivel_depois = np.nanmean(depois, axis=-1)
+        salto = nivel_depois / precos[:, : depois.shape[1]] - 1
+    flags[:, : depois.shape[1]] = np.abs(np.nan_to_num(salto)) >= salto_minimo
+    return flags
+
+
+def detectar_anomalias(veiculos, datas, precos, janela=JANELA, z_limite=Z_LIMITE, salto_minimo=SALTO_MINIMO):
+    # Tudo sobre a matriz veículos × meses inteira, sem laço por veículo
+    retornos = calcular_retornos(precos)
+    z = calcular_zscores(retornos, janela)
+    mudancas = detectar_pontos_mudanca(precos, salto_minimo)
+
+    marcados = (np.abs(np.nan_to_num(z)) >= z_limite) | (mudancas & (np.abs(np.nan_to_num(retornos)) >= salto_minimo))
+    linhas, colunas = np.nonzero(marcados)
+
+    anomalias = veiculos.iloc[linhas].reset_index(drop=True)
+    anomalias["Mês"] = datas[colunas + 1]
+    anomalias["Preço Anterior (R$)"] = precos[linhas, colunas]
+    anomalias["Preço (R$)"] = precos[linhas, colunas + 1]
+    anomalias["Variação (%)"] = np.round(retornos[linhas, colunas] * 100, 2)
+    anomalias["Z-score"] = np.round(z[linhas, colunas], 2)
+    anomalias["Mudança de nível"] = mudancas[linhas, colunas]
+    ordem = np.lexsort((-anomalias["Variação (%)"].abs().to_numpy(), -anomalias["Z-score"].abs().fillna(0).to_numpy()))
+    return anomalias.iloc[ordem].reset_index(drop=True)
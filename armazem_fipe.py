@@ -0,0 +1,95 @@
+import os
+import sys
+import pandas as pd
+
+ARQUIVO_HISTORICOS = os.path.join("dados", "historicos_fipe.parquet")
+
+# Mesmo esquema do exportar_historicos_fipe.py, para importar as exportações direto
+TIPOS = {
+    "tipo_veiculo": "int8",  # código da API oficial: 1 carros, 2 motos, 3 caminhões
+    "codigo_marca": "int32", "marca": "string",
+    "codigo_modelo": "int32", "modelo": "string",
+    "ano_modelo": "int16", "codigo_combustivel": "int8", "codigo_ano": "string",
+    "codigo_fipe": "string", "codigo_referencia": "int32",
+    "data_referencia": "datetime64[ns]", "preco": "float64",
+    "fonte": "string",  # API que respondeu o preço (fontes_fipe): a v2 ou a oficial em failover
+}
+CHAVE_VEICULO = ["tipo_veiculo", "codigo_marca", "codigo_modelo", "codigo_ano"]
+
+
+def padronizar(df):
+    if "tipo_veiculo" not in df:
+        # Exportações e armazéns anteriores aos tipos de veículo só tinham carros
+        df = df.assign(tipo_veiculo=1)
+    if "fonte" not in df:
+        # Antes do seletor de fontes todo histórico vinha da v2
+        df = df.assign(fonte="fipe_v2")
+    df = df.reindex(columns=list(TIPOS))
+    df["data_referencia"] = pd.to_datetime(df["data_referencia"])
+    return df.astype(TIPOS)
+
+
+def historicos_vazios():
+    return padronizar(pd.DataFrame(columns=list(TIPOS)))
+
+
+def carregar_historicos(caminho=ARQUIVO_HISTORICOS):
+    if not os.path.exists(caminho):
+        return historicos_vazios()
+    return padronizar(pd.read_parquet(caminho))
+
+
+def salvar_historicos(df, caminho=ARQUIVO_HISTORICOS):
+    # Escreve em arquivo temporário e troca de uma vez: leitores nunca veem arquivo pela metade
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    padronizar(df).to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+
+
+def mesclar_historicos(novos, caminho=ARQUIVO_HISTORICOS):
+    atuais = carregar_historicos(caminho)
+    partes = [df for df in (atuais, padronizar(novos)) if not df.empty]
+    if not partes:
+        return atuais
+    mesclado = (
+        pd.concat(partes, ignore_index=True)
+        .drop_duplicates(CHAVE_VEICULO + ["data_referencia"], keep="last")
+        .sort_values(CHAVE_VEICULO + ["data_referencia"])
+        .reset_index(drop=True)
+    )
+    salvar_historicos(mesclado, caminho)
+    return mesclado
+
+
+def matriz_precos(df):
+    # Veículos × meses em um único pivot; devolve as chaves, o eixo de datas e o array NumPy
+    tabela = df.pivot_table(index=CHAVE_VEICULO, columns="data_referencia", values="preco", aggfunc="last")
+    tabela = tabela.sort_index(axis=1)
+    nomes = (
+        df.drop_duplicates(CHAVE_VEICULO, keep="last")
+        .set_index(CHAVE_VEICULO)[["marca", "modelo", "ano_modelo", "codigo_fipe"]]
+        .reindex(tabela.index)
+    )
+    return nomes.reset_index(), pd.DatetimeIndex(tabela.columns), tabela.to_numpy(dtype="float64")
+
+
+def importar_arquivo(caminho):
+    if caminho.endswith(".csv"):
+        novos = pd.read_csv(caminho, sep=";", encoding="utf-8-sig", dtype={"codigo_ano": str, "codigo_fipe": str})
+    elif caminho.endswith(".arrow"):
+        import pyarrow as pa
+        novos = pa.ipc.open_file(caminho).read_all().to_pandas()
+    else:
+        novos = pd.read_parquet(caminho)
+    return mesclar_historicos(novos)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python armazem_fipe.py <exportação .parquet/.arrow/.csv> [...]")
+        sys.exit(2)
+    for arquivo in sys.argv[1:]:
+        historicos = importar_arquivo(arquivo)
+        print(f"✅ '{arquivo}' importado: {historicos[CHAVE_VEICULO].drop_duplicates().shape[0]} veículos, "
+              f"{len(historicos)} preços no armazém")
@@ -0,0 +1,163 @@
+import functools
+import math
+import os
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+from cache_ttl import CacheTTL
+
+ORCAMENTO_MB = float(os.getenv("CACHE_MEMORIA_MB", "256"))
+POLITICA = os.getenv("CACHE_POLITICA", "lru")  # "lru" ou "lfu"
+POLITICAS = ("lru", "lfu")
+
+
+def tamanho_em_bytes(valor):
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    # JSON das APIs (dicts/listas/strings): soma recursiva aproximada
+    total, pilha = 0, [valor]
+    while pilha:
+        item = pilha.pop()
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            pilha.extend(item.keys())
+            pilha.extend(item.values())
+        elif isinstance(item, (list, tuple, set)):
+            pilha.extend(item)
+    return total
+
+
+def congelar(valor):
+    # Arrays do cache ficam somente leitura: quem recebe não consegue alterar o valor guardado
+    if isinstance(valor, np.ndarray):
+        valor.flags.writeable = False
+    elif isinstance(valor, (pd.DataFrame, pd.Series)):
+        for array in getattr(valor._mgr, "arrays", []):
+            if isinstance(array, np.ndarray):
+                array.flags.writeable = False
+    elif isinstance(valor, (list, tuple)):
+        for item in valor:
+            congelar(item)
+    return valor
+
+
+def entregar(valor):
+    # Sem cópia profunda: frames voltam como cópia rasa (mesmos buffers, congelados);
+    # colunas novas ou renomeações no frame recebido não afetam o cache
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return valor.copy(deep=False)
+    if isinstance(valor, list) and any(isinstance(item, (pd.DataFrame, pd.Series)) for item in valor):
+        return [entregar(item) for item in valor]
+    return valor
+
+
+class CacheMemoria(CacheTTL):
+    # Cache com orçamento em bytes: cada entrada é medida ao entrar e as menos recentes (LRU)
+    # ou menos usadas (LFU) saem até caber. Misses simultâneos continuam coalescidos.
+
+    def __init__(self, orcamento_mb=ORCAMENTO_MB, politica=POLITICA, ttl=None):
+        if politica not in POLITICAS:
+            raise ValueError(f"política de cache desconhecida: {politica}")
+        super().__init__(ttl=ttl, max_itens=None)
+        self.orcamento = int(orcamento_mb * 1024 * 1024)
+        self.politica = politica
+        self.bytes_usados = 0
+        self._acessos = {}
+        self.estatisticas = dict.fromkeys(("acertos", "falhas", "despejos", "bytes_despejados", "rejeitados"), 0)
+
+    def _remover(self, chave):
+        _, _, tamanho = self._dados.pop(chave)
+        del self._acessos[chave]
+        self.bytes_usados -= tamanho
+        return tamanho
+
+    def _despejar(self):
+        # LFU desempata pela ordem de uso: entre os menos frequentes, sai o mais antigo
+        if self.politica == "lfu":
+            chave = min(self._dados, key=self._acessos.__getitem__)
+        else:
+            chave = next(iter(self._dados))
+        self.estatisticas["despejos"] += 1
+        self.estatisticas["bytes_despejados"] += self._remover(chave)
+
+    def obter(self, chave, padrao=None):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    self._remover(chave)
+                self.estatisticas["falhas"] += 1
+                return padrao
+            self._dados.move_to_end(chave)
+            self._acessos[chave] += 1
+            self.estatisticas["acertos"] += 1
+            return item[1]
+
+    def guardar(self, chave, valor, ttl=None):
+        tamanho = tamanho_em_bytes(valor)
+        ttl = self.ttl if ttl is None else ttl
+        expira_em = time.monotonic() + ttl if ttl else math.inf
+        with self._lock:
+            if chave in self._dados:
+                self._remover(chave)
+            if tamanho > self.orcamento:
+                self.estatisticas["rejeitados"] += 1
+                return
+            while self._dados and self.bytes_usados + tamanho > self.orcamento:
+                self._despejar()
+            self._dados[chave] = (expira_em, congelar(valor), tamanho)
+            self._acessos[chave] = 1
+            self.bytes_usados += tamanho
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+            self._acessos.clear()
+            self.bytes_usados = 0
+
+    def resumo(self):
+        with self._lock:
+            consultas = self.estatisticas["acertos"] + self.estatisticas["falhas"]
+            return {
+                **self.estatisticas,
+                "taxa_acerto": round(self.estatisticas["acertos"] / consultas, 3) if consultas else 0.0,
+                "itens": len(self._dados),
+                "mb_usados": round(self.bytes_usados / 1024 / 1024, 2),
+                "mb_orcamento": round(self.orcamento / 1024 / 1024, 2),
+                "politica": self.politica,
+            }
+
+
+_caches = {}
+_lock_caches = threading.Lock()
+
+
+def obter_cache(nome="padrao"):
+    # Um cache por nome e por processo, compartilhado entre as sessões do Streamlit
+    # (o script principal roda de novo a cada rerun; este módulo não)
+    with _lock_caches:
+        if nome not in _caches:
+            _caches[nome] = CacheMemoria()
+        return _caches[nome]
+
+
+def memorizar(cache="padrao", ttl=None):
+    # Substituto do @st.cache_data com orçamento de memória e sem cópia profunda a cada acerto
+    def decorador(funcao):
+        nome = f"{funcao.__module__}.{funcao.__qualname__}"
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            chave = (nome, args, tuple(sorted(kwargs.items())))
+            return entregar(obter_cache(cache).obter_ou_calcular(chave, lambda: funcao(*args, **kwargs), ttl))
+
+        return envolvida
+
+    return decorador
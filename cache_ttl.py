@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+
+_AUSENTE = object()
+
+
+class _ChamadaEmVoo:
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.valor = None
+        self.erro = None
+
+
+class CacheTTL:
+    # Cache LRU em memória com expiração por entrada, seguro entre threads.
+    # Misses simultâneos da mesma chave são coalescidos em uma única chamada.
+
+    def __init__(self, ttl=300, max_itens=1024):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+        self._em_voo = {}
+
+    def obter(self, chave, padrao=None):
+        with self._lock:
+            item = self._dados.get(chave, _AUSENTE)
+            if item is _AUSENTE:
+                return padrao
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._dados[chave]
+                return padrao
+            self._dados.move_to_end(chave)
+            return valor
+
+    def guardar(self, chave, valor, ttl=None):
+        expira_em = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._dados[chave] = (expira_em, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.max_itens:
+                self._dados.popitem(last=False)
+
+    def obter_ou_calcular(self, chave, funcao, ttl=None):
+        valor = self.obter(chave, _AUSENTE)
+        if valor is not _AUSENTE:
+            return valor
+
+        with self._lock:
+            chamada = self._em_voo.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = self._em_voo[chave] = _ChamadaEmVoo()
+
+        if not lider:
+            chamada.evento.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return chamada.valor
+
+        try:
+            chamada.valor = funcao()
+            self.guardar(chave, chamada.valor, ttl)
+            return chamada.valor
+        except Exception as erro:
+            chamada.erro = erro
+            raise
+        finally:
+            with self._lock:
+                del self._em_voo[chave]
+            chamada.evento.set()
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+
+    def __contains__(self, chave):
+        return self.obter(chave, _AUSENTE) is not _AUSENTE
+
+    def __len__(self):
+        return len(self._dados)
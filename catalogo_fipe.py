@@ -0,0 +1,166 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import requests
+
+from cliente_api import obter_cliente
+from cota_api import com_prioridade_atual
+from normalizacao import converter_preco_brl
+from tipos_veiculo import TIPO_PADRAO, TIPOS_VEICULO, caminho_v2
+
+ARQUIVO_CATALOGO = os.path.join("dados", "catalogo_fipe.csv")
+ARQUIVO_PARCIAL = os.path.join("dados", "catalogo_fipe.parcial.csv")
+COLUNAS_CATALOGO = [
+    "Tipo", "Marca", "Código Marca", "Modelo", "Código Modelo",
+    "Ano", "Combustível", "Código Ano", "Código FIPE", "Preço (R$)"
+]
+
+
+class CatalogoIncompleto(Exception):
+    # Uma requisição falhou (429, cota esgotada, rede): salvar o que veio deixaria o catálogo truncado
+    pass
+
+
+def requisitar_dados(endpoint, parametros=None):
+    try:
+        return obter_cliente("fipe_v2").requisitar(endpoint, parametros)
+    except requests.HTTPError as erro:
+        if erro.response is not None and erro.response.status_code == 404:
+            return None
+        raise CatalogoIncompleto(f"{endpoint}: {erro}") from erro
+    except (requests.RequestException, ValueError) as erro:
+        raise CatalogoIncompleto(f"{endpoint}: {erro}") from erro
+
+
+class ProgressoCatalogo:
+    # Rastreamento retomável: cada marca concluída vai para um CSV parcial marcado com a referência;
+    # a próxima tentativa da mesma referência (ex.: no dia seguinte, com cota nova) pula essas marcas
+
+    def __init__(self, referencia, caminho=ARQUIVO_PARCIAL):
+        self.referencia = str(referencia)
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        anteriores = carregar_catalogo(caminho, dtype={"Referência": str})
+        if anteriores is None or (anteriores["Referência"] != self.referencia).any():
+            self.remover()
+            anteriores = pd.DataFrame(columns=COLUNAS_CATALOGO + ["Referência"])
+        self.linhas = anteriores[COLUNAS_CATALOGO]
+        self.concluidas = set(zip(self.linhas["Tipo"], self.linhas["Código Marca"].astype(int)))
+
+    def concluir(self, tipo, cod_marca, linhas):
+        with self._lock:
+            if linhas:
+                os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+                pd.DataFrame(linhas, columns=COLUNAS_CATALOGO).assign(**{"Referência": self.referencia}).to_csv(
+                    self.caminho, sep=";", index=False, encoding="utf-8-sig", mode="a",
+                    header=not os.path.exists(self.caminho))
+            self.concluidas.add((tipo, cod_marca))
+
+    def remover(self):
+        if os.path.exists(self.caminho):
+            os.remove(self.caminho)
+
+
+def montar_catalogo(marcas_filtro=None, com_precos=True, tipo=TIPO_PADRAO, progresso=None, interromper=None):
+    prefixo = caminho_v2(tipo)
+    marcas = requisitar_dados(f"{prefixo}/brands") or []
+    if marcas_filtro:
+        marcas = [m for m in marcas if any(f.lower() in m["name"].lower() for f in marcas_filtro)]
+
+    linhas = []
+    for marca in marcas:
+        if progresso is not None and (tipo, int(marca["code"])) in progresso.concluidas:
+            continue
+        modelos = requisitar_dados(f"{prefixo}/brands/{marca['code']}/models") or []
+        print(f"🔍 {TIPOS_VEICULO[tipo]['rotulo']} / {marca['name']}: {len(modelos)} modelos")
+        linhas_marca = []
+        for modelo in modelos:
+            if interromper is not None and interromper.is_set():
+                raise CatalogoIncompleto("interrompido: o rastreamento de outro tipo falhou")
+            endpoint_anos = f"{prefixo}/brands/{marca['code']}/models/{modelo['code']}/years"
+            for ano in requisitar_dados(endpoint_anos) or []:
+                ano_modelo, _, _ = ano["code"].partition("-")
+                linha = {
+                    "Tipo": tipo,
+                    "Marca": marca["name"],
+                    "Código Marca": int(marca["code"]),
+                    "Modelo": modelo["name"],
+                    "Código Modelo": int(modelo["code"]),
+                    "Ano": int(ano_modelo),
+                    "Combustível": ano["name"].partition(" ")[2],
+                    "Código Ano": ano["code"],
+                    "Código FIPE": None,
+                    "Preço (R$)": None,
+                }
+                if com_precos:
+                    dados = requisitar_dados(f"{endpoint_anos}/{ano['code']}")
+                    if dados:
+                        linha["Código FIPE"] = dados.get("codeFipe")
+                        linha["Preço (R$)"] = converter_preco_brl(dados.get("price"))
+                linhas_marca.append(linha)
+        if progresso is not None:
+            progresso.concluir(tipo, int(marca["code"]), linhas_marca)
+        linhas.extend(linhas_marca)
+
+    return pd.DataFrame(linhas, columns=COLUNAS_CATALOGO)
+
+
+def montar_catalogo_tipos(tipos=tuple(TIPOS_VEICULO), marcas_filtro=None, com_precos=True, progresso=None):
+    # Um rastreamento por tipo ao mesmo tempo; limite de taxa e cota são os do cliente compartilhado.
+    # Se um tipo falha, os outros param na próxima iteração em vez de gastar cota à toa.
+    interromper = threading.Event()
+
+    def montar(tipo):
+        try:
+            return montar_catalogo(marcas_filtro, com_precos, tipo, progresso, interromper)
+        except CatalogoIncompleto:
+            interromper.set()
+            raise
+
+    with ThreadPoolExecutor(max_workers=len(tipos)) as executor:
+        catalogos = list(executor.map(com_prioridade_atual(montar), tipos))
+    if progresso is not None and not progresso.linhas.empty:
+        catalogos.insert(0, progresso.linhas)
+    return pd.concat(catalogos, ignore_index=True)
+
+
+def salvar_catalogo(df, caminho=ARQUIVO_CATALOGO):
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = f"{caminho}.tmp"
+    df.to_csv(temporario, sep=";", index=False, encoding="utf-8-sig")
+    os.replace(temporario, caminho)
+
+
+def carregar_catalogo(caminho=ARQUIVO_CATALOGO, dtype=None):
+    if not os.path.exists(caminho):
+        return None
+    catalogo = pd.read_csv(
+        caminho, sep=";", encoding="utf-8-sig",
+        dtype={"Tipo": str, "Código Ano": str, "Código FIPE": str, "Combustível": str, **(dtype or {})}
+    )
+    if "Tipo" not in catalogo:
+        # Catálogos antigos só tinham carros
+        catalogo.insert(0, "Tipo", TIPO_PADRAO)
+    return catalogo
+
+
+if __name__ == "__main__":
+    from cota_api import definir_prioridade_padrao
+
+    definir_prioridade_padrao("lote")
+    filtro_tipos = input(f"Tipos ({', '.join(TIPOS_VEICULO)}; vazio = todos): ").strip()
+    tipos = [t.strip() for t in filtro_tipos.split(",") if t.strip() in TIPOS_VEICULO] or list(TIPOS_VEICULO)
+    filtro = input("Marcas a incluir (separadas por vírgula, vazio = todas): ").strip()
+    marcas_filtro = [m.strip() for m in filtro.split(",") if m.strip()] or None
+
+    try:
+        catalogo = montar_catalogo_tipos(tipos, marcas_filtro)
+    except CatalogoIncompleto as erro:
+        print(f"\n❌ Catálogo não salvo, rastreamento incompleto: {erro}")
+        exit(1)
+    if catalogo.empty:
+        print("\n⚠️ Nenhum modelo encontrado.")
+    else:
+        salvar_catalogo(catalogo)
+        print(f"\n✅ Catálogo com {len(catalogo)} versões salvo em '{ARQUIVO_CATALOGO}'")
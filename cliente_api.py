@@ -0,0 +1,236 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+import requests
+from urllib3.util.retry import Retry
+import dotenv
+
+from cache_ttl import CacheTTL
+from cota_api import ARQUIVO_COTA, AgendadorCota
+from gravacao_http import criar_adaptador
+from limitador_taxa import LimitadorTaxa
+
+# Carrega as chaves das APIs uma única vez para todos os scripts
+dotenv.load_dotenv()
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/115.0.0.0 Safari/537.36"
+STATUS_PARA_RETENTATIVA = (429, 500, 502, 503, 504)
+
+
+@dataclass
+class ConfigProvedor:
+    nome: str
+    url_base: str
+    metodo: str = "GET"
+    headers: dict = field(default_factory=dict)
+    timeout: float = 15
+    tentativas: int = 3
+    fator_espera: float = 0.5
+    requisicoes_por_segundo: float = None
+    ttl_cache: float = 0
+    max_itens_cache: int = 2048
+    max_conexoes: int = 10
+    cota_diaria: int = None
+
+
+PROVEDORES = {
+    "fipe_v2": ConfigProvedor(
+        nome="fipe_v2",
+        url_base="https://fipe.parallelum.com.br/api/v2",
+        headers={
+            "accept": "application/json",
+            "X-Subscription-Token": os.getenv("CHAVE_API_FIPE"),
+            "User-Agent": USER_AGENT,
+        },
+        requisicoes_por_segundo=5,
+        ttl_cache=3600,
+        max_itens_cache=8192,
+        cota_diaria=int(os.getenv("COTA_DIARIA_FIPE", "1000")),
+    ),
+    "fipe_oficial": ConfigProvedor(
+        nome="fipe_oficial",
+        url_base="http://veiculos.fipe.org.br/api/veiculos",
+        metodo="POST",
+        headers={
+            "Referer": "http://veiculos.fipe.org.br",
+            "Content-Type": "application/json",
+        },
+        requisicoes_por_segundo=1,
+        ttl_cache=3600,
+        max_itens_cache=8192,
+    ),
+    "ibge": ConfigProvedor(
+        nome="ibge",
+        url_base="https://servicodados.ibge.gov.br/api",
+        timeout=30,
+        requisicoes_por_segundo=20,
+        ttl_cache=24 * 3600,
+    ),
+    "spotify": ConfigProvedor(
+        nome="spotify",
+        url_base="https://api.spotify.com/v1",
+        timeout=10,
+    ),
+    "spotify_token": ConfigProvedor(
+        nome="spotify_token",
+        url_base="https://accounts.spotify.com/api/token",
+        metodo="POST",
+        timeout=10,
+    ),
+    "openweather": ConfigProvedor(
+        nome="openweather",
+        url_base="https://api.openweathermap.org/data/2.5",
+        timeout=10,
+        requisicoes_por_segundo=10,
+    ),
+}
+
+
+class RetentativasContadas(Retry):
+    # O Retry repete dentro do urllib3, abaixo do agendador: cada nova tentativa avisa a cota
+
+    def __init__(self, *args, ao_repetir=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ao_repetir = ao_repetir
+
+    def new(self, **kwargs):
+        nova = super().new(**kwargs)
+        nova.ao_repetir = self.ao_repetir
+        return nova
+
+    def increment(self, *args, **kwargs):
+        # Só chega ao retorno se houver outra tentativa; esgotado, o urllib3 levanta MaxRetryError
+        nova = super().increment(*args, **kwargs)
+        if self.ao_repetir:
+            self.ao_repetir()
+        return nova
+
+
+class MetricasCliente:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requisicoes = 0
+        self.erros = 0
+        self.acertos_cache = 0
+        self.tempo_total = 0.0
+
+    def registrar(self, duracao, erro=False):
+        with self._lock:
+            self.requisicoes += 1
+            self.erros += int(erro)
+            self.tempo_total += duracao
+
+    def registrar_acerto_cache(self):
+        with self._lock:
+            self.acertos_cache += 1
+
+    def resumo(self):
+        with self._lock:
+            return {
+                "requisicoes": self.requisicoes,
+                "erros": self.erros,
+                "acertos_cache": self.acertos_cache,
+                "latencia_media_ms": round(self.tempo_total / self.requisicoes * 1000, 1) if self.requisicoes else 0.0,
+            }
+
+
+class ClienteAPI:
+    # Sessão com pool de conexões, timeout, retentativas com backoff,
+    # limite de taxa, cache TTL (com coalescência) e métricas por provedor.
+
+    def __init__(self, config):
+        self.config = config
+        self.sessao = requests.Session()
+        self.sessao.headers.update({k: v for k, v in config.headers.items() if v is not None})
+        # Cota diária por token (hoje só a FIPE v2): prioridade interativo > atualização > lote.
+        # Reproduzindo cassete nada chega à API: a contagem vai para um banco em memória, sem gastar
+        # nem travar a cota real de dados/cota_api.db nos testes de carga
+        arquivo_cota = ":memory:" if os.getenv("API_GRAVACAO") == "reproduzir" else ARQUIVO_COTA
+        self.agendador = (
+            AgendadorCota(config.nome, config.headers.get("X-Subscription-Token"), config.cota_diaria, arquivo_cota)
+            if config.cota_diaria else None
+        )
+        retentativas = RetentativasContadas(
+            total=config.tentativas,
+            backoff_factor=config.fator_espera,
+            status_forcelist=STATUS_PARA_RETENTATIVA,
+            allowed_methods=None,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+            ao_repetir=self.agendador.registrar_retentativa if self.agendador else None,
+        )
+        # API_GRAVACAO=gravar/reproduzir troca o transporte por um cassete (testes de carga offline)
+        adaptador = criar_adaptador(config.nome, pool_connections=2, pool_maxsize=config.max_conexoes,
+                                    max_retries=retentativas)
+        self.sessao.mount("http://", adaptador)
+        self.sessao.mount("https://", adaptador)
+
+        self.limitador = LimitadorTaxa(config.requisicoes_por_segundo) if config.requisicoes_por_segundo else None
+        self.cache = CacheTTL(ttl=config.ttl_cache, max_itens=config.max_itens_cache) if config.ttl_cache else None
+        self.metricas = MetricasCliente()
+
+    def montar_url(self, endpoint=""):
+        return f"{self.config.url_base}/{endpoint}" if endpoint else self.config.url_base
+
+    def _executar(self, url, parametros=None, corpo=None, dados=None, headers=None, auth=None):
+        if self.agendador:
+            self.agendador.liberar(self.limitador)
+        elif self.limitador:
+            self.limitador.aguardar()
+        inicio = time.perf_counter()
+        erro = True
+        try:
+            resposta = self.sessao.request(
+                self.config.metodo, url, params=parametros, json=corpo, data=dados,
+                headers=headers, auth=auth, timeout=self.config.timeout
+            )
+            resposta.raise_for_status()
+            resultado = resposta.json()
+            erro = False
+            return resultado
+        finally:
+            self.metricas.registrar(time.perf_counter() - inicio, erro)
+
+    def requisitar(self, endpoint="", parametros=None, corpo=None, dados=None, headers=None, auth=None,
+                   usar_cache=True):
+        url = self.montar_url(endpoint)
+        executar = lambda: self._executar(url, parametros, corpo, dados, headers, auth)
+        if self.cache is None or not usar_cache or auth is not None:
+            return executar()
+
+        chave = (url, json.dumps(parametros, sort_keys=True, default=str), json.dumps(corpo, sort_keys=True, default=str))
+        if chave in self.cache:
+            self.metricas.registrar_acerto_cache()
+        return self.cache.obter_ou_calcular(chave, executar)
+
+    def obter_json(self, endpoint="", parametros=None, corpo=None, **kwargs):
+        # Variante para os scripts: qualquer falha (HTTP, conexão, timeout, JSON inválido) vira None
+        try:
+            return self.requisitar(endpoint, parametros, corpo, **kwargs)
+        except (requests.RequestException, ValueError) as erro:
+            print(f"[ERRO] {self.config.nome}: não foi possível obter os dados: {erro}")
+            return None
+
+
+_clientes = {}
+_lock_clientes = threading.Lock()
+
+
+def obter_cliente(nome):
+    # Um cliente compartilhado por provedor; API_URL_<PROVEDOR> troca a URL base (ex.: servidor stub local)
+    with _lock_clientes:
+        if nome not in _clientes:
+            config = PROVEDORES[nome]
+            url_base = os.getenv(f"API_URL_{nome.upper()}")
+            if url_base:
+                config = ConfigProvedor(**{**config.__dict__, "url_base": url_base.rstrip("/")})
+            _clientes[nome] = ClienteAPI(config)
+        return _clientes[nome]
+
+
+def resumo_metricas():
+    with _lock_clientes:
+        return {nome: cliente.metricas.resumo() for nome, cliente in _clientes.items()}
@@ -0,0 +1,60 @@
+import os
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+from cache_ttl import CacheTTL
+from cliente_api import obter_cliente
+from normalizacao import normalizar_texto
+
+TTL_TEMPO = 600  # o tempo muda devagar; 10 minutos por cidade
+
+
+def normalizar_cidade(local):
+    return " ".join(str(local).split())
+
+
+class ClienteOpenWeather:
+    # Sessão, pool, retentativas e limite de taxa vêm do cliente "openweather" (cliente_api.py);
+    # aqui fica só o cache por nome de cidade normalizado
+
+    def __init__(self, chave=None, ttl=TTL_TEMPO):
+        self.chave = chave or os.environ["CHAVE_API_OPENWEATHER"]
+        self.api = obter_cliente("openweather")
+        self.max_conexoes = self.api.config.max_conexoes
+        self.cache = CacheTTL(ttl=ttl, max_itens=4096)
+
+    def requisitar_dados(self, parametros):
+        return self.api.requisitar("weather", parametros)
+
+    def _buscar(self, local):
+        try:
+            return self.requisitar_dados({
+                'appid': self.chave,
+                'q': local,
+                'units': 'metric',
+                'lang': 'pt_br'
+            })
+        except requests.HTTPError as erro:
+            # Só "cidade não encontrada" é resposta definitiva; 429/5xx sobem e não entram no cache
+            if erro.response is not None and erro.response.status_code == 404:
+                return None
+            raise
+
+    def tempo_para_local(self, local):
+        local = normalizar_cidade(local)
+        if not local:
+            return None
+        # Sessões diferentes pedindo a mesma cidade ao mesmo tempo disparam um único request;
+        # cidades não encontradas (404 -> None) também ficam em cache pelo TTL, falhas não
+        try:
+            return self.cache.obter_ou_calcular(normalizar_texto(local), lambda: self._buscar(local))
+        except (requests.RequestException, ValueError) as erro:
+            print(f"[ERRO] openweather: não foi possível obter os dados de '{local}': {erro}")
+            return None
+
+    def tempo_para_varios(self, locais):
+        locais = list(dict.fromkeys(normalizar_cidade(l) for l in locais if normalizar_cidade(l)))
+        if not locais:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_conexoes, len(locais))) as executor:
+            return dict(zip(locais, executor.map(self.tempo_para_local, locais)))
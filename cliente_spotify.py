@@ -0,0 +1,82 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.auth import HTTPBasicAuth
+
+from cache_ttl import CacheTTL
+from cliente_api import obter_cliente
+
+MARGEM_EXPIRACAO = 60  # renova o token um pouco antes de expirar
+MAX_IDS_POR_REQUEST = 50  # limite do endpoint /v1/artists?ids=
+
+
+class ClienteSpotify:
+    # Sessão, pool e retentativas vêm dos clientes "spotify"/"spotify_token" (cliente_api.py)
+
+    def __init__(self, client_id=None, client_secret=None, ttl_busca=600, ttl_top=3600):
+        client_id = client_id or os.environ["CHAVE_API_SPOTIFY"]
+        client_secret = client_secret or os.environ["CHAVE_CLIENT_SECRET"]
+        self._auth = HTTPBasicAuth(username=client_id, password=client_secret)
+
+        self.api = obter_cliente("spotify")
+        self.contas = obter_cliente("spotify_token")
+        self.max_conexoes = self.api.config.max_conexoes
+
+        self._token = None
+        self._token_expira_em = 0.0
+        self._lock_token = threading.Lock()
+
+        self.cache_busca = CacheTTL(ttl=ttl_busca, max_itens=512)
+        self.cache_top = CacheTTL(ttl=ttl_top, max_itens=2048)
+        self.cache_artistas = CacheTTL(ttl=ttl_top, max_itens=4096)
+
+    # 🔑 Token client-credentials reaproveitado até perto do expires_in
+    def obter_token(self, forcar=False):
+        with self._lock_token:
+            if forcar or self._token is None or time.monotonic() >= self._token_expira_em:
+                dados = self.contas.requisitar(dados={"grant_type": "client_credentials"}, auth=self._auth)
+                self._token = dados["access_token"]
+                validade = dados.get("expires_in", 3600) - MARGEM_EXPIRACAO
+                self._token_expira_em = time.monotonic() + max(validade, 0)
+            return self._token
+
+    def requisitar(self, endpoint, parametros=None):
+        try:
+            headers = {"Authorization": f"Bearer {self.obter_token()}"}
+            return self.api.requisitar(endpoint, parametros, headers=headers)
+        except requests.HTTPError as erro:
+            if erro.response is None or erro.response.status_code != 401:
+                raise
+            headers = {"Authorization": f"Bearer {self.obter_token(forcar=True)}"}
+            return self.api.requisitar(endpoint, parametros, headers=headers)
+
+    def buscar_artistas(self, nome_artista, limite=5):
+        chave = (nome_artista.strip().lower(), limite)
+        return self.cache_busca.obter_ou_calcular(
+            chave,
+            lambda: self.requisitar("search", {"q": nome_artista, "type": "artist", "limit": limite})["artists"]["items"]
+        )
+
+    def buscar_top_musicas(self, id_artista, pais="BR"):
+        return self.cache_top.obter_ou_calcular(
+            (id_artista, pais),
+            lambda: self.requisitar(f"artists/{id_artista}/top-tracks", {"market": pais})["tracks"]
+        )
+
+    def buscar_top_musicas_varios(self, ids_artistas, pais="BR"):
+        ids_artistas = list(dict.fromkeys(ids_artistas))
+        with ThreadPoolExecutor(max_workers=min(self.max_conexoes, len(ids_artistas) or 1)) as executor:
+            resultados = executor.map(lambda i: self.buscar_top_musicas(i, pais), ids_artistas)
+            return dict(zip(ids_artistas, resultados))
+
+    def obter_artistas(self, ids_artistas):
+        ids_artistas = list(dict.fromkeys(ids_artistas))
+        faltantes = [i for i in ids_artistas if i not in self.cache_artistas]
+        for inicio in range(0, len(faltantes), MAX_IDS_POR_REQUEST):
+            lote = faltantes[inicio:inicio + MAX_IDS_POR_REQUEST]
+            for artista in self.requisitar("artists", {"ids": ",".join(lote)})["artists"]:
+                if artista:
+                    self.cache_artistas.guardar(artista["id"], artista)
+        return [a for a in (self.cache_artistas.obter(i) for i in ids_artistas) if a]
@@ -0,0 +1,33 @@
+import pandas as pd
+
+
+def alinhar_historicos(veiculos, coluna="Preço (R$)", preencher=True):
+    # Um único concat (outer join) põe todos os históricos no mesmo eixo de meses:
+    # linhas = meses de referência, colunas = veículos
+    if not veiculos:
+        return pd.DataFrame()
+    matriz = pd.concat({nome: df[coluna] for nome, df in veiculos}, axis=1).sort_index()
+    matriz.columns.name = "Veículo"
+    if preencher:
+        # Só lacunas internas: não inventa preço antes do primeiro nem depois do último mês
+        matriz = matriz.ffill(limit_area="inside")
+    return matriz
+
+
+def calcular_variacoes(matriz):
+    primeiro = matriz.bfill().iloc[0]
+    ultimo = matriz.ffill().iloc[-1]
+    # Variação do mês mais recente do eixo comum; NaN se o veículo não tem esse mês
+    mensal = matriz.diff().iloc[-1]
+    mensal_pct = (matriz / matriz.shift(1) - 1).iloc[-1] * 100
+
+    variacoes = pd.DataFrame({
+        "Preço Atual (R$)": ultimo,
+        "Último Mês (R$)": mensal,
+        "Último Mês (%)": mensal_pct,
+        "Acumulado (R$)": ultimo - primeiro,
+        "Acumulado (%)": (ultimo / primeiro - 1) * 100,
+        "Meses cobertos": matriz.notna().sum(),
+    })
+    variacoes.index.name = "Veículo"
+    return variacoes.round(2)
@@ -0,0 +1,186 @@
+import contextlib
+import contextvars
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+import requests
+
+ARQUIVO_COTA = os.path.join("dados", "cota_api.db")
+
+# Quanto menor o número, maior a prioridade
+PRIORIDADES = {"interativo": 0, "atualizacao": 1, "lote": 2}
+# Até que fração da cota diária cada prioridade pode levar o consumo: o resto fica para as de cima
+LIMITE_USO = {"interativo": 1.0, "atualizacao": 0.9, "lote": 0.7}
+DEMANDA_INTERATIVA_ALTA = 30  # requisições interativas no último minuto que fazem o lote ceder a vez
+ESPERA_CEDER = 5  # segundos
+
+_prioridade_atual = contextvars.ContextVar("prioridade_api", default=None)
+_prioridade_padrao = "interativo"
+
+
+class CotaEsgotada(requests.RequestException):
+    # Para quem chama é como um 429: obter_json devolve None e os apps seguem funcionando
+    pass
+
+
+def _validar(nome):
+    if nome not in PRIORIDADES:
+        raise ValueError(f"prioridade desconhecida: {nome}")
+
+
+def definir_prioridade_padrao(nome):
+    # Para scripts inteiros: Rank e exportação → "lote", worker → "atualizacao"
+    global _prioridade_padrao
+    _validar(nome)
+    _prioridade_padrao = nome
+
+
+@contextlib.contextmanager
+def prioridade(nome):
+    _validar(nome)
+    token = _prioridade_atual.set(nome)
+    try:
+        yield
+    finally:
+        _prioridade_atual.reset(token)
+
+
+def prioridade_atual():
+    return _prioridade_atual.get() or _prioridade_padrao
+
+
+def com_prioridade_atual(funcao):
+    # Threads de pool não herdam ContextVars: sem isso o trabalho submetido cairia na prioridade
+    # padrão do processo ("interativo" nos apps). Captura a prioridade de quem submete e a reaplica.
+    nome = prioridade_atual()
+
+    def envolvida(*args, **kwargs):
+        with prioridade(nome):
+            return funcao(*args, **kwargs)
+
+    return envolvida
+
+
+class FilaPrioridade:
+    # Na disputa pelo limitador de taxa, quem tem prioridade maior passa na frente
+
+    def __init__(self):
+        self._condicao = threading.Condition()
+        self._esperando = Counter()
+
+    @contextlib.contextmanager
+    def vez(self, nivel):
+        with self._condicao:
+            self._esperando[nivel] += 1
+            while any(self._esperando[n] for n in range(nivel)):
+                self._condicao.wait()
+        try:
+            yield
+        finally:
+            with self._condicao:
+                self._esperando[nivel] -= 1
+                self._condicao.notify_all()
+
+
+class AgendadorCota:
+    # Conta o consumo diário do token em SQLite (compartilhado entre apps, worker e varreduras),
+    # reserva parte da cota para as prioridades maiores e faz o lote ceder sob demanda interativa.
+
+    def __init__(self, provedor, token, cota_diaria, caminho=ARQUIVO_COTA):
+        self.provedor = provedor
+        self.token = hashlib.sha1(f"{provedor}:{token}".encode("utf-8")).hexdigest()[:12]  # nunca o token em si
+        self.cota_diaria = cota_diaria
+        self.fila = FilaPrioridade()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        self._conexao = sqlite3.connect(caminho, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS consumo (
+                dia TEXT, minuto INTEGER, token TEXT, prioridade TEXT, quantidade INTEGER,
+                PRIMARY KEY (dia, minuto, token, prioridade)
+            )
+        """)
+
+    @staticmethod
+    def _agora():
+        # A cota do provedor vira à meia-noite UTC
+        agora = datetime.now(timezone.utc)
+        return agora.strftime("%Y-%m-%d"), int(agora.timestamp() // 60)
+
+    def consumo_hoje(self):
+        dia, _ = self._agora()
+        with self._lock:
+            linhas = self._conexao.execute(
+                "SELECT prioridade, SUM(quantidade) FROM consumo WHERE dia = ? AND token = ? GROUP BY prioridade",
+                (dia, self.token),
+            ).fetchall()
+        return {nome: 0 for nome in PRIORIDADES} | dict(linhas)
+
+    def demanda_interativa(self):
+        # Requisições interativas no último minuto, somando todos os processos
+        dia, minuto = self._agora()
+        with self._lock:
+            (total,) = self._conexao.execute(
+                "SELECT COALESCE(SUM(quantidade), 0) FROM consumo "
+                "WHERE dia = ? AND token = ? AND prioridade = 'interativo' AND minuto >= ?",
+                (dia, self.token, minuto - 1),
+            ).fetchone()
+        return total
+
+    def disponiveis(self, nome=None):
+        nome = nome or prioridade_atual()
+        usadas = sum(self.consumo_hoje().values())
+        return max(int(self.cota_diaria * LIMITE_USO[nome]) - usadas, 0)
+
+    def liberar(self, limitador=None):
+        # Chamado antes de cada requisição real (acerto de cache não gasta cota)
+        nome = prioridade_atual()
+        if self.disponiveis(nome) <= 0:
+            raise CotaEsgotada(f"{self.provedor}: cota diária reservada para prioridades acima de '{nome}'")
+        if nome == "lote":
+            while self.demanda_interativa() >= DEMANDA_INTERATIVA_ALTA:
+                time.sleep(ESPERA_CEDER)
+        with self.fila.vez(PRIORIDADES[nome]):
+            if limitador:
+                limitador.aguardar()
+        self._registrar(nome)
+
+    def registrar_retentativa(self):
+        # Retentativa do urllib3 é mais uma requisição real no token: conta, mas não espera a vez de novo
+        self._registrar(prioridade_atual())
+
+    def _registrar(self, nome):
+        dia, minuto = self._agora()
+        with self._lock:
+            self._conexao.execute(
+                "INSERT INTO consumo VALUES (?, ?, ?, ?, 1) "
+                "ON CONFLICT (dia, minuto, token, prioridade) DO UPDATE SET quantidade = quantidade + 1",
+                (dia, minuto, self.token, nome),
+            )
+
+    def projetar(self, requisicoes, nome="lote"):
+        # A varredura planejada cabe no que sobra hoje para a prioridade dela?
+        disponiveis = self.disponiveis(nome)
+        consumo = self.consumo_hoje()
+        return {
+            "cota_diaria": self.cota_diaria,
+            "consumidas_hoje": sum(consumo.values()),
+            "por_prioridade": consumo,
+            "disponiveis": disponiveis,
+            "necessarias": requisicoes,
+            "cabe": requisicoes <= disponiveis,
+        }
+
+    def resumo(self):
+        consumo = self.consumo_hoje()
+        return {
+            "cota_diaria": self.cota_diaria,
+            "consumidas_hoje": sum(consumo.values()),
+            "por_prioridade": consumo,
+            "demanda_interativa_ultimo_minuto": self.demanda_interativa(),
+        }
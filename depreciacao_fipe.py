@@ -0,0 +1,194 @@
+import hashlib
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+from armazem_fipe import CHAVE_VEICULO, carregar_historicos, matriz_precos
+from normalizacao import normalizar_texto
+from tipos_veiculo import tipo_por_codigo
+
+ARQUIVO_INDICE = os.path.join("dados", "indice_depreciacao.parquet")
+JANELAS = (1, 6, 12, 24)  # meses
+ANO_ZERO_KM = 32000  # código de ano usado pela FIPE para veículos 0 km
+
+COMBUSTIVEIS = {1: "Gasolina", 2: "Álcool", 3: "Diesel", 4: "Elétrico", 5: "Flex", 6: "Híbrido"}
+PREFIXOS_FAMILIA = {"new", "grand", "space", "nova", "novo", "cross", "super"}
+SEGMENTO = ["tipo", "marca", "familia", "combustivel", "idade_anos"]
+COLUNAS_ASSINATURA = CHAVE_VEICULO + ["marca", "modelo", "ano_modelo", "preco"]
+
+
+def familia_do_modelo(modelo):
+    # "Corolla XEi 2.0 Flex 16V Aut." → "COROLLA"; "Grand Siena ATTRACTIVE 1.4" → "GRAND SIENA"
+    palavras = normalizar_texto(modelo).replace(".", " ").split()
+    if not palavras:
+        return ""
+    if palavras[0] in PREFIXOS_FAMILIA and len(palavras) > 1:
+        return f"{palavras[0]} {palavras[1]}".upper()
+    return palavras[0].upper()
+
+
+def calcular_agregados(veiculos, datas, precos, novas_datas=None, janelas=JANELAS):
+    # Depreciação em k meses para cada veículo × mês de uma vez; agrega só os meses pedidos
+    segmentos = pd.DataFrame({
+        "tipo": veiculos["tipo_veiculo"].map(tipo_por_codigo).to_numpy(),
+        "marca": veiculos["marca"].astype(str).to_numpy(),
+        "familia": veiculos["modelo"].astype(str).map(familia_do_modelo).to_numpy(),
+        "combustivel": veiculos["codigo_ano"].astype(str).str.split("-").str[1].astype(int).map(COMBUSTIVEIS).fillna("Outro").to_numpy(),
+    })
+    anos = veiculos["ano_modelo"].to_numpy(dtype=int)
+    meses_do_ano_modelo = np.where(anos == ANO_ZERO_KM, -1, anos * 12)
+    meses_das_datas = datas.year.to_numpy() * 12 + datas.month.to_numpy() - 1
+
+    partes = []
+    for janela in janelas:
+        if janela >= len(datas):
+            continue
+        colunas = np.arange(janela, len(datas))
+        if novas_datas is not None:
+            colunas = colunas[np.isin(datas[colunas], novas_datas)]
+        if not len(colunas):
+            continue
+        with np.errstate(divide="ignore", invalid="ignore"):
+            depreciacao = (1 - precos[:, colunas] / precos[:, colunas - janela]) * 100
+        idade = meses_das_datas[colunas][None, :] - meses_do_ano_modelo[:, None]
+        idade = np.where(meses_do_ano_modelo[:, None] < 0, 0, idade)
+
+        linhas, posicoes = np.nonzero(np.isfinite(depreciacao) & (idade >= 0))
+        longo = segmentos.iloc[linhas].reset_index(drop=True)
+        longo["idade_anos"] = (idade[linhas, posicoes] // 12).astype("int16")
+        longo["data_referencia"] = datas[colunas[posicoes]]
+        longo["janela_meses"] = np.int16(janela)
+        longo["depreciacao"] = depreciacao[linhas, posicoes]
+        partes.append(longo)
+
+    if not partes:
+        return pd.DataFrame(columns=["data_referencia", "janela_meses"] + SEGMENTO + ["media", "mediana", "veiculos"])
+    longo = pd.concat(partes, ignore_index=True)
+    agregados = (
+        longo.groupby(["data_referencia", "janela_meses"] + SEGMENTO, observed=True)["depreciacao"]
+        .agg(media="mean", mediana="median", veiculos="size")
+        .reset_index()
+    )
+    agregados[["media", "mediana"]] = agregados[["media", "mediana"]].round(3)
+    return agregados
+
+
+def carregar_indice(caminho=ARQUIVO_INDICE):
+    if not os.path.exists(caminho):
+        return None
+    indice = pd.read_parquet(caminho)
+    if "tipo" not in indice:
+        # Índices gerados antes dos tipos de veículo só tinham carros
+        indice.insert(2, "tipo", "carros")
+    return indice
+
+
+def assinaturas_por_mes(historicos, datas, janelas=JANELAS):
+    # Um mês do índice depende das linhas dele e dos meses comparados em cada janela; a assinatura
+    # muda quando um veículo entra (backfill, importação), sai ou muda de preço em qualquer um deles
+    linhas = pd.util.hash_pandas_object(historicos[COLUNAS_ASSINATURA], index=False)
+    por_mes = linhas.groupby(historicos["data_referencia"].to_numpy()).sum().reindex(datas).to_numpy(dtype="uint64")
+    marcas = datas.asi8.astype("uint64")
+    assinaturas = {}
+    for coluna, data in enumerate(datas):
+        entradas = [coluna] + [coluna - janela for janela in janelas if janela <= coluna]
+        resumo = hashlib.blake2b(np.concatenate([marcas[entradas], por_mes[entradas]]).tobytes(), digest_size=8)
+        assinaturas[data] = int.from_bytes(resumo.digest(), "little", signed=True)
+    return assinaturas
+
+
+def atualizar_indice(historicos=None, caminho=ARQUIVO_INDICE):
+    # Incremental: só são agregados os meses cuja assinatura mudou desde a última gravação
+    historicos = carregar_historicos() if historicos is None else historicos
+    indice = carregar_indice(caminho)
+    if historicos.empty:
+        return indice
+    veiculos, datas, precos = matriz_precos(historicos)
+    assinaturas = assinaturas_por_mes(historicos, datas)
+    if indice is None or "assinatura" not in indice:
+        # Índice novo ou anterior às assinaturas: reagrega tudo uma vez
+        indice, anteriores = None, {}
+    else:
+        anteriores = indice.groupby("data_referencia")["assinatura"].first().to_dict()
+    # Meses antes da menor janela não geram segmentos; sem esse corte seriam refeitos a cada chamada
+    alterados = pd.DatetimeIndex([d for d in datas[min(JANELAS):] if anteriores.get(d) != assinaturas[d]])
+    if not len(alterados):
+        return indice
+
+    novos = calcular_agregados(veiculos, datas, precos, alterados)
+    novos["assinatura"] = novos["data_referencia"].map(assinaturas).astype("int64")
+    if indice is not None:
+        indice = pd.concat([indice[~indice["data_referencia"].isin(alterados)], novos], ignore_index=True)
+    else:
+        indice = novos
+    indice = indice.sort_values(["data_referencia", "janela_meses"], kind="stable").reset_index(drop=True)
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    indice.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+    return indice
+
+
+def consultar_depreciacao(indice, marca=None, familia=None, combustivel=None, idade_anos=None,
+                          janela_meses=12, data_referencia=None, tipo=None):
+    # Ex.: consultar_depreciacao(indice, marca="Toyota", familia="Corolla", idade_anos=10)
+    filtro = indice["janela_meses"] == janela_meses
+    data = pd.Timestamp(data_referencia) if data_referencia else indice.loc[filtro, "data_referencia"].max()
+    filtro &= indice["data_referencia"] == data
+    if tipo:
+        filtro &= indice["tipo"] == tipo
+    if marca:
+        filtro &= indice["marca"].str.contains(marca, case=False, regex=False)
+    if familia:
+        filtro &= indice["familia"] == familia_do_modelo(familia)
+    if combustivel:
+        filtro &= indice["combustivel"].str.lower() == combustivel.lower()
+    if idade_anos is not None:
+        filtro &= indice["idade_anos"] == idade_anos
+    segmentos = indice[filtro]
+    if segmentos.empty:
+        return None, segmentos
+    resumo = {
+        "data_referencia": data,
+        "janela_meses": janela_meses,
+        "veiculos": int(segmentos["veiculos"].sum()),
+        # Combinação de segmentos: média exata ponderada; mediana aproximada pela ponderação das medianas
+        "media": round(float(np.average(segmentos["media"], weights=segmentos["veiculos"])), 3),
+        "mediana_aprox": round(float(np.average(segmentos["mediana"], weights=segmentos["veiculos"])), 3),
+    }
+    return resumo, segmentos.reset_index(drop=True)
+
+
+def ranking_familias(indice, marca, idade_anos, janela_meses=12, tipo=None):
+    # Quem perdeu menos valor: famílias da marca com a idade pedida, no mês mais recente do índice
+    _, segmentos = consultar_depreciacao(indice, marca=marca, idade_anos=idade_anos, janela_meses=janela_meses,
+                                         tipo=tipo)
+    if segmentos.empty:
+        return segmentos
+    ranking = (
+        segmentos.groupby(["marca", "familia"])
+        .apply(lambda g: pd.Series({
+            "media": np.average(g["media"], weights=g["veiculos"]),
+            "veiculos": g["veiculos"].sum(),
+        }), include_groups=False)
+        .reset_index()
+        .sort_values("media")
+    )
+    ranking["media"] = ranking["media"].round(2)
+    ranking["veiculos"] = ranking["veiculos"].astype(int)
+    return ranking.reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    indice = atualizar_indice()
+    if indice is None:
+        print("⚠️ Nenhum histórico no armazém para indexar.")
+        sys.exit(1)
+    print(f"✅ Índice de depreciação com {len(indice)} segmentos × mês salvo em '{ARQUIVO_INDICE}'")
+
+    # Consulta opcional: python depreciacao_fipe.py <marca> [família] [idade em anos]
+    if len(sys.argv) > 1:
+        marca, familia, idade = (sys.argv[1:] + [None, None])[:3]
+        resumo, _ = consultar_depreciacao(indice, marca, familia, idade_anos=int(idade) if idade else None)
+        print(resumo or "⚠️ Nenhum segmento encontrado.")
@@ -0,0 +1,254 @@
+import argparse
+import csv
+import itertools
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import pandas as pd
+
+from catalogo_fipe import CatalogoIncompleto, carregar_catalogo, montar_catalogo_tipos
+from cota_api import com_prioridade_atual, definir_prioridade_padrao
+from historico_fipe import obter_referencias, obter_historico
+from tipos_veiculo import TIPOS_VEICULO, codigo_oficial
+
+COLUNAS = [
+    ("tipo_veiculo", "int8"),
+    ("codigo_marca", "int32"), ("marca", "string"),
+    ("codigo_modelo", "int32"), ("modelo", "string"),
+    ("ano_modelo", "int16"), ("codigo_combustivel", "int8"), ("codigo_ano", "string"),
+    ("codigo_fipe", "string"), ("codigo_referencia", "int32"),
+    ("data_referencia", "date"), ("preco", "float64"), ("fonte", "string"),
+]
+
+
+NOMES_COLUNAS = [nome for nome, _ in COLUNAS]
+TAMANHO_LOTE = 64 * 1024  # linhas por row group (Parquet) / record batch (Arrow)
+
+
+def esquema_arrow(colunas=None):
+    import pyarrow as pa
+    tipos = {
+        "int8": pa.int8(), "int16": pa.int16(), "int32": pa.int32(),
+        "float64": pa.float64(), "string": pa.string(), "date": pa.date32(),
+    }
+    tipo_por_nome = dict(COLUNAS)
+    return pa.schema([(nome, tipos[tipo_por_nome[nome]]) for nome in colunas or NOMES_COLUNAS])
+
+
+class EscritorColunar:
+    # Acumula as linhas dos veículos e grava em lotes grandes: um row group por veículo (~25 linhas)
+    # anularia as estatísticas e a compressão do Parquet e incharia o rodapé
+
+    def __init__(self, colunas=None, tamanho_lote=TAMANHO_LOTE):
+        self.esquema = esquema_arrow(colunas)
+        self.tamanho_lote = tamanho_lote
+        self.pendentes = []
+
+    def escrever(self, linhas):
+        self.pendentes.extend(linhas)
+        while len(self.pendentes) >= self.tamanho_lote:
+            self.descarregar(self.tamanho_lote)
+
+    def descarregar(self, quantidade=None):
+        import pyarrow as pa
+        quantidade = len(self.pendentes) if quantidade is None else quantidade
+        lote, self.pendentes = self.pendentes[:quantidade], self.pendentes[quantidade:]
+        if lote:
+            # from_pylist só lê as colunas do esquema: as demais chaves das linhas ficam de fora
+            self.gravar(pa.Table.from_pylist(lote, schema=self.esquema))
+
+    def fechar(self):
+        try:
+            self.descarregar()
+        finally:
+            self.escritor.close()
+
+
+class EscritorParquet(EscritorColunar):
+
+    def __init__(self, caminho, colunas=None):
+        import pyarrow.parquet as pq
+        super().__init__(colunas)
+        self.escritor = pq.ParquetWriter(caminho, self.esquema, compression="zstd")
+
+    def gravar(self, tabela):
+        self.escritor.write_table(tabela, row_group_size=self.tamanho_lote)
+
+
+class EscritorArrow(EscritorColunar):
+
+    def __init__(self, caminho, colunas=None):
+        import pyarrow as pa
+        super().__init__(colunas)
+        self.arquivo = pa.OSFile(caminho, "wb")
+        self.escritor = pa.ipc.new_file(self.arquivo, self.esquema)
+
+    def gravar(self, tabela):
+        self.escritor.write_table(tabela, max_chunksize=self.tamanho_lote)
+
+    def fechar(self):
+        try:
+            super().fechar()
+        finally:
+            self.arquivo.close()
+
+
+class EscritorCSV:
+    # Mesmo formato do fipe_variacao_completa.csv (";" e utf-8-sig) para abrir no Excel
+
+    def __init__(self, caminho, colunas=None):
+        self.arquivo = open(caminho, "w", newline="", encoding="utf-8-sig")
+        self.escritor = csv.DictWriter(self.arquivo, fieldnames=colunas or NOMES_COLUNAS, delimiter=";",
+                                       extrasaction="ignore")
+        self.escritor.writeheader()
+
+    def escrever(self, linhas):
+        self.escritor.writerows(linhas)
+        self.arquivo.flush()
+
+    def fechar(self):
+        self.arquivo.close()
+
+
+ESCRITORES = {"parquet": EscritorParquet, "arrow": EscritorArrow, "csv": EscritorCSV}
+
+
+def selecionar_veiculos(catalogo, marca=None, modelo=None, ano=None, arquivo_lista=None, tipos=None):
+    selecao = catalogo
+    if tipos:
+        selecao = selecao[selecao["Tipo"].isin(tipos)]
+    if marca:
+        selecao = selecao[selecao["Marca"].str.contains(marca, case=False, regex=False)]
+    if modelo:
+        selecao = selecao[selecao["Modelo"].str.contains(modelo, case=False, regex=False)]
+    if ano:
+        selecao = selecao[selecao["Ano"] == ano]
+    if arquivo_lista:
+        # Lista no formato Marca;Modelo;Ano (como VEICULOS_FIXOS)
+        lista = pd.read_csv(arquivo_lista, sep=";", encoding="utf-8-sig")
+        mascara = pd.Series(False, index=selecao.index)
+        for item in lista.itertuples(index=False):
+            mascara |= (
+                selecao["Marca"].str.contains(str(item.Marca), case=False, regex=False)
+                & selecao["Modelo"].str.contains(str(item.Modelo), case=False, regex=False)
+                & (selecao["Ano"] == int(item.Ano))
+            )
+        selecao = selecao[mascara]
+    return selecao.drop_duplicates(["Tipo", "Código Marca", "Código Modelo", "Código Ano"])
+
+
+def linhas_do_veiculo(veiculo, referencias):
+    ano_modelo, _, combustivel = str(veiculo["Código Ano"]).partition("-")
+    tipo = veiculo.get("Tipo", "carros")
+    historico = obter_historico(veiculo["Código Marca"], veiculo["Código Modelo"], veiculo["Código Ano"], referencias, tipo)
+    return [
+        {
+            "tipo_veiculo": codigo_oficial(tipo),
+            "codigo_marca": int(veiculo["Código Marca"]),
+            "marca": veiculo["Marca"],
+            "codigo_modelo": int(veiculo["Código Modelo"]),
+            "modelo": veiculo["Modelo"],
+            "ano_modelo": int(ano_modelo),
+            "codigo_combustivel": int(combustivel or 0),
+            "codigo_ano": str(veiculo["Código Ano"]),
+            **h,
+        }
+        for h in historico
+    ]
+
+
+def exportar(veiculos, referencias, caminho, formato, trabalhadores=4, lotes_por_trabalhador=4, colunas=None):
+    escritor = ESCRITORES[formato](caminho, colunas)
+    total_linhas = 0
+    concluidos = 0
+    pendentes_max = trabalhadores * lotes_por_trabalhador
+    tarefa = com_prioridade_atual(linhas_do_veiculo)
+    fila = (linha.to_dict() for _, linha in veiculos.iterrows())
+    try:
+        with ThreadPoolExecutor(max_workers=trabalhadores) as executor:
+            # Janela limitada de veículos em andamento: as linhas de cada um vão para o escritor assim que
+            # termina, que grava a cada TAMANHO_LOTE; a memória não cresce com o tamanho do catálogo
+            em_voo = {executor.submit(tarefa, v, referencias) for v in itertools.islice(fila, pendentes_max)}
+            while em_voo:
+                prontos, em_voo = wait(em_voo, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    linhas = futuro.result()
+                    if linhas:
+                        escritor.escrever(linhas)
+                        total_linhas += len(linhas)
+                    concluidos += 1
+                    print(f"\r🚗 {concluidos}/{len(veiculos)} veículos, {total_linhas} linhas", end="", flush=True)
+                em_voo |= {executor.submit(tarefa, v, referencias)
+                           for v in itertools.islice(fila, pendentes_max - len(em_voo))}
+    finally:
+        escritor.fechar()
+    print()
+    return total_linhas
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Exporta históricos mensais da FIPE em Parquet, Arrow ou CSV.")
+    parser.add_argument("--marca", help="filtro por nome da marca (trecho, sem diferenciar maiúsculas)")
+    parser.add_argument("--modelo", help="filtro por nome do modelo (trecho)")
+    parser.add_argument("--ano", type=int, help="ano-modelo exato")
+    parser.add_argument("--lista", help="CSV Marca;Modelo;Ano com os veículos a exportar")
+    parser.add_argument("--tipo", action="append", choices=sorted(TIPOS_VEICULO),
+                        help="tipo de veículo (pode repetir; padrão: todos do catálogo)")
+    parser.add_argument("--meses", type=int, default=None, help="quantidade de referências mais recentes (padrão: todas)")
+    parser.add_argument("--formato", choices=sorted(ESCRITORES), default="parquet")
+    parser.add_argument("--saida", help="arquivo de saída (padrão: fipe_historicos.<formato>)")
+    parser.add_argument("--trabalhadores", type=int, default=4, help="veículos processados em paralelo")
+    parser.add_argument("--colunas", help=f"colunas a gravar, separadas por vírgula (padrão: todas — {','.join(NOMES_COLUNAS)})")
+    return parser
+
+
+def main(argv=None):
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    colunas = [c.strip() for c in args.colunas.split(",") if c.strip()] if args.colunas else None
+    if colunas is not None:
+        desconhecidas = [c for c in colunas if c not in NOMES_COLUNAS]
+        if desconhecidas or not colunas:
+            parser.error(f"--colunas: use nomes entre {', '.join(NOMES_COLUNAS)}")
+        colunas = list(dict.fromkeys(colunas))
+    definir_prioridade_padrao("lote")
+    if not (args.marca or args.modelo or args.ano or args.lista):
+        print("⚠️ Informe ao menos um filtro (--marca, --modelo, --ano ou --lista).")
+        return 2
+    if args.formato != "csv":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("⚠️ Os formatos parquet/arrow precisam do pacote 'pyarrow' (pip install pyarrow) ou use --formato csv.")
+            return 2
+
+    catalogo = carregar_catalogo()
+    if catalogo is None:
+        print("📥 Catálogo local não encontrado; consultando a API...")
+        try:
+            catalogo = montar_catalogo_tipos(args.tipo or tuple(TIPOS_VEICULO), [args.marca] if args.marca else None,
+                                             com_precos=False)
+        except CatalogoIncompleto as erro:
+            print(f"❌ Não foi possível montar o catálogo: {erro}")
+            return 1
+
+    veiculos = selecionar_veiculos(catalogo, args.marca, args.modelo, args.ano, args.lista, args.tipo)
+    if veiculos.empty:
+        print("⚠️ Nenhum veículo corresponde aos filtros.")
+        return 1
+
+    referencias = obter_referencias(args.meses)
+    if not referencias:
+        print("❌ Erro ao obter referências FIPE.")
+        return 1
+
+    saida = args.saida or f"fipe_historicos.{args.formato}"
+    os.makedirs(os.path.dirname(saida) or ".", exist_ok=True)
+    print(f"📤 Exportando {len(veiculos)} veículos × {len(referencias)} referências para '{saida}'")
+    total = exportar(veiculos, referencias, saida, args.formato, args.trabalhadores, colunas=colunas)
+    print(f"✅ {total} linhas salvas em '{saida}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+import abc
+import itertools
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import pandas as pd
+import requests
+
+from armazem_fipe import CHAVE_VEICULO
+from cliente_api import obter_cliente
+from cota_api import com_prioridade_atual
+from normalizacao import converter_preco_brl
+from referencias_fipe import calendario
+from tipos_veiculo import TIPO_PADRAO, caminho_v2, codigo_oficial, tipo_por_codigo
+
+ESPERA_APOS_LIMITE = 60  # segundos fora do rodízio após 401/403/429
+ESPERA_APOS_ERRO = 10
+STATUS_INDISPONIVEL = {401, 403, 429}  # chave recusada ou limite: a fonte está fora, não o veículo
+TOLERANCIA_PCT = 0.5
+# Como os históricos escolhem a fonte: "failover" (v2 e, se ela cair ou a cota acabar, a oficial) ou "balancear"
+MODO_FONTES = os.getenv("FIPE_FONTES_MODO", "failover")
+
+
+@dataclass(frozen=True)
+class VeiculoFipe:
+    # Os códigos de marca, modelo e ano ("2012-1") são os mesmos nas duas APIs
+    cod_marca: int
+    cod_modelo: int
+    cod_ano: str
+    tipo: str = TIPO_PADRAO
+
+    @property
+    def ano_modelo(self):
+        return int(self.cod_ano.split("-")[0])
+
+    @property
+    def cod_combustivel(self):
+        return int(self.cod_ano.split("-")[1])
+
+
+@dataclass(frozen=True)
+class PrecoFipe:
+    fonte: str
+    codigo_fipe: str
+    data_referencia: pd.Timestamp
+    preco: float
+
+
+class FonteIndisponivel(Exception):
+
+    def __init__(self, fonte, espera):
+        super().__init__(f"{fonte} indisponível por {espera}s")
+        self.espera = espera
+
+
+class FonteFipe(abc.ABC):
+    # Cada fonte traduz (veículo, mês) para o seu próprio esquema de códigos.
+    # A chave comum entre as fontes é o veículo + o primeiro dia do mês de referência.
+    nome = None
+
+    def __init__(self):
+        self.cliente = obter_cliente(self.nome)
+
+    def codigo_referencia(self, data):
+        # Sem calendário (429, cota esgotada, rede) ou sem o mês nele: a próxima fonte do seletor tenta
+        cal = calendario(self.nome)
+        if cal.empty:
+            raise FonteIndisponivel(self.nome, ESPERA_APOS_ERRO)
+        codigos = cal.index[cal["data"] == pd.Timestamp(data)]
+        if not len(codigos):
+            raise FonteIndisponivel(self.nome, 0)  # mês ainda não publicado aqui; a fonte segue saudável
+        return int(codigos[0])
+
+    def datas_disponiveis(self):
+        return list(calendario(self.nome)["data"].dropna())
+
+    def _requisitar(self, endpoint, parametros=None, corpo=None):
+        try:
+            return self.cliente.requisitar(endpoint, parametros, corpo)
+        except requests.HTTPError as erro:
+            status = erro.response.status_code if erro.response is not None else None
+            if status in STATUS_INDISPONIVEL:
+                raise FonteIndisponivel(self.nome, ESPERA_APOS_LIMITE) from erro
+            if status is not None and status < 500:
+                return None  # veículo/mês inexistente nesta fonte
+            raise FonteIndisponivel(self.nome, ESPERA_APOS_ERRO) from erro
+        except (requests.RequestException, ValueError) as erro:
+            raise FonteIndisponivel(self.nome, ESPERA_APOS_ERRO) from erro
+
+    @abc.abstractmethod
+    def consultar_preco(self, veiculo, data):
+        pass
+
+
+class FonteParallelum(FonteFipe):
+    nome = "fipe_v2"
+
+    def consultar_preco(self, veiculo, data):
+        codigo = self.codigo_referencia(data)
+        endpoint = (f"{caminho_v2(veiculo.tipo)}/brands/{veiculo.cod_marca}"
+                    f"/models/{veiculo.cod_modelo}/years/{veiculo.cod_ano}")
+        dados = self._requisitar(endpoint, {"reference": codigo})
+        preco = converter_preco_brl(dados.get("price")) if dados else None
+        if preco is None:
+            return None
+        return PrecoFipe(self.nome, dados.get("codeFipe"), pd.Timestamp(data), preco)
+
+
+class FonteOficial(FonteFipe):
+    nome = "fipe_oficial"
+
+    def consultar_preco(self, veiculo, data):
+        codigo = self.codigo_referencia(data)
+        dados = self._requisitar("ConsultarValorComTodosParametros", corpo={
+            "codigoTabelaReferencia": codigo,
+            "codigoTipoVeiculo": codigo_oficial(veiculo.tipo),
+            "codigoMarca": veiculo.cod_marca,
+            "ano": veiculo.cod_ano,
+            "codigoTipoCombustivel": veiculo.cod_combustivel,
+            "anoModelo": veiculo.ano_modelo,
+            "codigoModelo": veiculo.cod_modelo,
+            "tipoConsulta": "tradicional",
+        })
+        # A API oficial responde 200 com {"codigo": "2", "erro": ...} quando não há preço
+        preco = converter_preco_brl(dados.get("Valor")) if dados and "Valor" in dados else None
+        if preco is None:
+            return None
+        return PrecoFipe(self.nome, dados.get("CodigoFipe"), pd.Timestamp(data), preco)
+
+
+FONTES = {fonte.nome: fonte for fonte in (FonteParallelum, FonteOficial)}
+FONTE_PRINCIPAL = FonteParallelum.nome
+
+
+class SeletorFontes:
+    # modo "failover": sempre a primeira fonte saudável; "balancear": rodízio entre as saudáveis.
+    # Fonte que devolve 429 ou erro de rede sai do rodízio por um tempo.
+
+    def __init__(self, nomes=("fipe_v2", "fipe_oficial"), modo="balancear"):
+        self.fontes = [FONTES[nome]() for nome in nomes]
+        self.modo = modo
+        self._rodizio = itertools.count()
+        self._indisponivel_ate = {fonte.nome: 0.0 for fonte in self.fontes}
+        self._lock = threading.Lock()
+
+    def _ordem(self):
+        agora = time.monotonic()
+        inicio = next(self._rodizio) % len(self.fontes) if self.modo == "balancear" else 0
+        ordem = self.fontes[inicio:] + self.fontes[:inicio]
+        with self._lock:
+            saudaveis = [f for f in ordem if self._indisponivel_ate[f.nome] <= agora]
+        return saudaveis or ordem
+
+    def consultar_preco(self, veiculo, data):
+        for fonte in self._ordem():
+            try:
+                return fonte.consultar_preco(veiculo, data)
+            except FonteIndisponivel as erro:
+                with self._lock:
+                    self._indisponivel_ate[fonte.nome] = time.monotonic() + erro.espera
+        return None
+
+
+_seletor = None
+_lock_seletor = threading.Lock()
+
+
+def obter_seletor():
+    # Um seletor por processo: o estado de saúde das fontes vale para todos os históricos
+    global _seletor
+    with _lock_seletor:
+        if _seletor is None:
+            _seletor = SeletorFontes(modo=MODO_FONTES)
+        return _seletor
+
+
+def veiculos_de_fallback(historicos):
+    # (veículo, mês) do armazém que vieram de outra fonte que não a principal: candidatos à reconciliação
+    fallback = historicos[historicos["fonte"] != FONTE_PRINCIPAL]
+    return [
+        (VeiculoFipe(int(v.codigo_marca), int(v.codigo_modelo), str(v.codigo_ano), tipo_por_codigo(v.tipo_veiculo)),
+         pd.Timestamp(v.data_referencia))
+        for v in fallback.drop_duplicates(CHAVE_VEICULO + ["data_referencia"]).itertuples()
+    ]
+
+
+def reconciliar_precos(pares, tolerancia_pct=TOLERANCIA_PCT, max_workers=4):
+    # Consulta os mesmos pares (veículo, mês) nas duas fontes e compara os preços
+    parallelum, oficial = FonteParallelum(), FonteOficial()
+
+    def comparar(par):
+        veiculo, data = par
+        precos = {}
+        for fonte in (parallelum, oficial):
+            try:
+                precos[fonte.nome] = fonte.consultar_preco(veiculo, data)
+            except FonteIndisponivel:
+                precos[fonte.nome] = None
+        return veiculo, data, precos
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        resultados = list(executor.map(com_prioridade_atual(comparar), pares))
+
+    linhas = []
+    for veiculo, data, precos in resultados:
+        p2, po = precos["fipe_v2"], precos["fipe_oficial"]
+        linhas.append({
+            "Tipo": veiculo.tipo,
+            "Código Marca": veiculo.cod_marca,
+            "Código Modelo": veiculo.cod_modelo,
+            "Código Ano": veiculo.cod_ano,
+            "Data": pd.Timestamp(data),
+            "Código FIPE": (p2 or po).codigo_fipe if (p2 or po) else None,
+            "Preço parallelum (R$)": p2.preco if p2 else None,
+            "Preço oficial (R$)": po.preco if po else None,
+        })
+    df = pd.DataFrame(linhas)
+    if df.empty:
+        return df
+    df["Diferença (%)"] = ((df["Preço parallelum (R$)"] / df["Preço oficial (R$)"] - 1) * 100).round(3)
+    df["Situação"] = "ok"
+    df.loc[df["Diferença (%)"].abs() > tolerancia_pct, "Situação"] = "divergente"
+    df.loc[df["Preço parallelum (R$)"].isna() | df["Preço oficial (R$)"].isna(), "Situação"] = "faltando"
+    return df
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--fallback"]:
+        # Reconcilia só o que o armazém recebeu da fonte de reserva durante falhas da principal
+        from armazem_fipe import carregar_historicos
+
+        pares = veiculos_de_fallback(carregar_historicos())
+        if not pares:
+            print("✅ Nenhum preço do armazém veio da fonte de reserva.")
+            sys.exit(0)
+    else:
+        from catalogo_fipe import carregar_catalogo
+
+        catalogo = carregar_catalogo()
+        if catalogo is None:
+            print("⚠️ Catálogo FIPE não encontrado. Rode 'python catalogo_fipe.py' antes.")
+            sys.exit(1)
+
+        quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+        meses = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+        amostra = catalogo.sample(min(quantidade, len(catalogo)), random_state=0)
+        veiculos = [VeiculoFipe(int(r["Código Marca"]), int(r["Código Modelo"]), str(r["Código Ano"]), r["Tipo"])
+                    for _, r in amostra.iterrows()]
+        datas = sorted(set(FonteParallelum().datas_disponiveis()) & set(FonteOficial().datas_disponiveis()))[-meses:]
+        pares = [(v, d) for v in veiculos for d in datas]
+
+    resultado = reconciliar_precos(pares)
+    resultado.to_csv("reconciliacao_fipe.csv", sep=";", index=False, encoding="utf-8-sig")
+    print(resultado["Situação"].value_counts().to_string() if not resultado.empty else "⚠️ Nada comparado.")
+    print("\n✅ Arquivo 'reconciliacao_fipe.csv' salvo com sucesso!")
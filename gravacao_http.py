@@ -0,0 +1,149 @@
+import atexit
+import glob
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# API_GRAVACAO=gravar      → passa pela rede e grava cada resposta (com a latência) no cassete
+# API_GRAVACAO=reproduzir  → responde só do cassete, sem rede, repetindo as latências gravadas
+PASTA_CASSETES = os.getenv("API_CASSETES", os.path.join("dados", "cassetes"))
+MODOS = ("gravar", "reproduzir")
+HEADERS_GRAVADOS = ("Content-Type", "Retry-After")
+MAX_LATENCIAS = 50  # amostras por requisição: bastam para a distribuição, sem inchar o cassete
+SALVAR_A_CADA = 50
+
+
+def chave_requisicao(requisicao):
+    # Método + URL com a query ordenada + corpo; headers (tokens, Basic auth) ficam de fora
+    partes = urlsplit(requisicao.url)
+    query = urlencode(sorted(parse_qsl(partes.query, keep_blank_values=True)))
+    corpo = requisicao.body or b""
+    if isinstance(corpo, str):
+        corpo = corpo.encode("utf-8")
+    bruto = f"{requisicao.method} {partes.scheme}://{partes.netloc}{partes.path}?{query}".encode("utf-8") + b"\n" + corpo
+    return hashlib.sha1(bruto).hexdigest()
+
+
+class Cassete:
+    # Cada processo grava o seu fragmento <provedor>-<pid>.json.gz (sessões de carga rodam em
+    # vários processos); a reprodução junta todos: {chave: {requisição, status, headers, corpo, latências}}
+
+    def __init__(self, nome, pasta=PASTA_CASSETES):
+        self.caminho = os.path.join(pasta, f"{nome}-{os.getpid()}.json.gz")
+        self.interacoes = {}
+        self.gravadas = {}
+        self._lock = threading.Lock()
+        self._novas = 0
+        for fragmento in sorted(glob.glob(os.path.join(pasta, f"{nome}-*.json.gz"))):
+            with gzip.open(fragmento, "rt", encoding="utf-8") as arquivo:
+                for chave, entrada in json.load(arquivo).items():
+                    anterior = self.interacoes.get(chave)
+                    if anterior:
+                        entrada["latencias"] = (anterior["latencias"] + entrada["latencias"])[-MAX_LATENCIAS:]
+                    self.interacoes[chave] = entrada
+
+    def registrar(self, requisicao, resposta, latencia):
+        chave = chave_requisicao(requisicao)
+        with self._lock:
+            entrada = self.gravadas.setdefault(chave, {
+                "requisicao": f"{requisicao.method} {requisicao.url}",
+                "latencias": [],
+            })
+            entrada["status"] = resposta.status_code
+            entrada["headers"] = {h: resposta.headers[h] for h in HEADERS_GRAVADOS if h in resposta.headers}
+            entrada["corpo"] = resposta.content.decode("utf-8", errors="replace")
+            entrada["latencias"] = (entrada["latencias"] + [round(latencia, 4)])[-MAX_LATENCIAS:]
+            self._novas += 1
+            salvar = self._novas >= SALVAR_A_CADA
+        if salvar:
+            self.salvar()
+
+    def buscar(self, requisicao):
+        return self.interacoes.get(chave_requisicao(requisicao))
+
+    def sortear_latencia(self, entrada):
+        # Latência de uma das gravações desta mesma requisição: preserva cauda lenta e variação
+        return random.choice(entrada["latencias"]) if entrada["latencias"] else 0.0
+
+    def salvar(self):
+        with self._lock:
+            if not self._novas:
+                return
+            os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+            temporario = f"{self.caminho}.tmp"
+            with gzip.open(temporario, "wt", encoding="utf-8") as arquivo:
+                json.dump(self.gravadas, arquivo, ensure_ascii=False, separators=(",", ":"))
+            os.replace(temporario, self.caminho)
+            self._novas = 0
+
+
+class AdaptadorGravacao(HTTPAdapter):
+    # Fica no lugar do HTTPAdapter da sessão: o resto do cliente (retentativas, cache, limite) não muda
+
+    def __init__(self, cassete, modo, velocidade=1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.cassete = cassete
+        self.modo = modo
+        self.velocidade = velocidade
+
+    def send(self, request, **kwargs):
+        if self.modo == "reproduzir":
+            entrada = self.cassete.buscar(request)
+            if entrada is None:
+                raise requests.ConnectionError(f"requisição não gravada no cassete: {request.method} {request.url}",
+                                               request=request)
+            if self.velocidade:
+                time.sleep(self.cassete.sortear_latencia(entrada) * self.velocidade)
+            return self._montar_resposta(request, entrada)
+
+        inicio = time.perf_counter()
+        resposta = super().send(request, **kwargs)
+        self.cassete.registrar(request, resposta, time.perf_counter() - inicio)
+        return resposta
+
+    def _montar_resposta(self, request, entrada):
+        resposta = requests.Response()
+        resposta.status_code = entrada["status"]
+        resposta.headers = CaseInsensitiveDict(entrada["headers"])
+        resposta._content = entrada["corpo"].encode("utf-8")
+        resposta.encoding = "utf-8"
+        resposta.url = request.url
+        resposta.request = request
+        resposta.connection = self
+        return resposta
+
+
+_cassetes = {}
+_lock_cassetes = threading.Lock()
+
+
+def obter_cassete(nome):
+    with _lock_cassetes:
+        if nome not in _cassetes:
+            _cassetes[nome] = Cassete(nome)
+        return _cassetes[nome]
+
+
+def criar_adaptador(nome, **kwargs):
+    # Sem API_GRAVACAO, o adaptador normal do requests
+    modo = os.getenv("API_GRAVACAO")
+    if modo not in MODOS:
+        return HTTPAdapter(**kwargs)
+    velocidade = float(os.getenv("API_GRAVACAO_VELOCIDADE", "1"))
+    return AdaptadorGravacao(obter_cassete(nome), modo, velocidade, **kwargs)
+
+
+@atexit.register
+def salvar_cassetes():
+    with _lock_cassetes:
+        cassetes = list(_cassetes.values())
+    for cassete in cassetes:
+        cassete.salvar()
@@ -0,0 +1,37 @@
+import pandas as pd
+
+from cliente_api import obter_cliente
+from fontes_fipe import VeiculoFipe, obter_seletor
+from referencias_fipe import data_do_mes
+from tipos_veiculo import TIPO_PADRAO
+
+
+def requisitar_dados(endpoint, parametros=None):
+    return obter_cliente("fipe_v2").obter_json(endpoint, parametros)
+
+
+def obter_referencias(num_meses=None):
+    referencias = requisitar_dados("references") or []
+    return referencias[:num_meses] if num_meses else referencias
+
+
+def obter_historico(cod_marca, cod_modelo, cod_ano, referencias, tipo=TIPO_PADRAO):
+    # Cada mês passa pelo seletor de fontes: se a v2 cair (429, erro, cota esgotada), a oficial responde
+    veiculo = VeiculoFipe(int(cod_marca), int(cod_modelo), str(cod_ano), tipo)
+    seletor = obter_seletor()
+    historico = []
+    for ref in referencias:
+        data = data_do_mes(ref["month"])
+        if pd.isna(data):
+            continue
+        preco = seletor.consultar_preco(veiculo, data)
+        if preco is None:
+            continue
+        historico.append({
+            "codigo_referencia": int(ref["code"]),
+            "data_referencia": data.date(),
+            "codigo_fipe": preco.codigo_fipe,
+            "preco": preco.preco,
+            "fonte": preco.fonte,
+        })
+    return sorted(historico, key=lambda h: h["codigo_referencia"])
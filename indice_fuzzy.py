@@ -0,0 +1,75 @@
+import difflib
+from functools import lru_cache
+import numpy as np
+
+from normalizacao import normalizar_texto
+
+CANDIDATOS_MINIMOS = 10
+
+
+def trigramas(texto):
+    texto = f"  {normalizar_texto(texto)} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceFuzzy:
+    # Índice invertido de trigramas: filtra candidatos pelo coeficiente de Dice
+    # e só aplica o SequenceMatcher (mesma medida do difflib) aos melhores.
+
+    def __init__(self, itens):
+        self.rotulos = [rotulo for rotulo, _ in itens]
+        self.codigos = [codigo for _, codigo in itens]
+        self.normalizados = [normalizar_texto(r) for r in self.rotulos]
+
+        postagens = {}
+        tamanhos = []
+        for i, rotulo in enumerate(self.rotulos):
+            gramas = trigramas(rotulo)
+            tamanhos.append(len(gramas))
+            for grama in gramas:
+                postagens.setdefault(grama, []).append(i)
+        self.postagens = {g: np.asarray(p, dtype=np.int32) for g, p in postagens.items()}
+        self.tamanhos = np.asarray(tamanhos, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.rotulos)
+
+    def buscar(self, consulta, k=5, corte=0.6):
+        if not self.rotulos:
+            return []
+        gramas = trigramas(consulta)
+        contagem = np.zeros(len(self.rotulos), dtype=np.int32)
+        for grama in gramas:
+            posicoes = self.postagens.get(grama)
+            if posicoes is not None:
+                contagem[posicoes] += 1
+        if not contagem.any():
+            return []
+
+        dice = 2 * contagem / (len(gramas) + self.tamanhos)
+        n = min(max(k * 4, CANDIDATOS_MINIMOS), len(dice))
+        candidatos = np.argpartition(-dice, n - 1)[:n]
+
+        consulta_normalizada = normalizar_texto(consulta)
+        comparador = difflib.SequenceMatcher()
+        comparador.set_seq2(consulta_normalizada)
+        resultado = []
+        for i in candidatos:
+            if contagem[i] == 0:
+                continue
+            comparador.set_seq1(self.normalizados[i])
+            score = comparador.ratio()
+            if score >= corte:
+                resultado.append((self.codigos[i], self.rotulos[i], round(score, 4)))
+        resultado.sort(key=lambda x: x[2], reverse=True)
+        return resultado[:k]
+
+
+@lru_cache(maxsize=256)
+def _indice_para_itens(itens):
+    return IndiceFuzzy(itens)
+
+
+def indice_para_lista(lista, chave_rotulo="Label", chave_codigo="Value"):
+    itens = tuple((item[chave_rotulo], item[chave_codigo]) for item in lista)
+    return _indice_para_itens(itens)
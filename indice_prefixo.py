@@ -0,0 +1,48 @@
+import sys
+import numpy as np
+
+from normalizacao import normalizar_texto
+
+FIM_PREFIXO = "￿"  # maior que qualquer caractere de texto normalizado
+
+
+class IndicePrefixo:
+    # Filtro "digite para buscar": cada palavra digitada precisa ser prefixo de alguma palavra do rótulo.
+    # As palavras ficam ordenadas uma vez; cada termo vira uma faixa contígua achada por busca binária,
+    # e os termos se combinam por interseção dos rótulos.
+
+    def __init__(self, rotulos):
+        self.rotulos = list(rotulos)
+        pares = sorted({
+            (palavra, i)
+            for i, rotulo in enumerate(self.rotulos)
+            for palavra in normalizar_texto(rotulo).split()
+        })
+        self.palavras = np.array([palavra for palavra, _ in pares], dtype=str)
+        self.posicoes = np.array([i for _, i in pares], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.rotulos)
+
+    def __sizeof__(self):
+        # Para o orçamento do cache_memoria, que mede com sys.getsizeof
+        return (object.__sizeof__(self) + self.palavras.nbytes + self.posicoes.nbytes
+                + sum(sys.getsizeof(r) for r in self.rotulos))
+
+    def _com_prefixo(self, termo):
+        inicio, fim = np.searchsorted(self.palavras, [termo, termo + FIM_PREFIXO])
+        return np.unique(self.posicoes[inicio:fim])
+
+    def buscar(self, texto, limite=None):
+        # Rótulos na ordem original; sem texto, todos
+        termos = normalizar_texto(texto).split()
+        if not termos:
+            return self.rotulos[:limite]
+        encontrados = None
+        # Termos mais longos primeiro: faixas menores, interseção encolhe mais cedo
+        for termo in sorted(set(termos), key=len, reverse=True):
+            posicoes = self._com_prefixo(termo)
+            encontrados = posicoes if encontrados is None else np.intersect1d(encontrados, posicoes, assume_unique=True)
+            if not len(encontrados):
+                return []
+        return [self.rotulos[i] for i in encontrados[:limite]]
@@ -0,0 +1,29 @@
+import threading
+import time
+
+
+class LimitadorTaxa:
+    # Token bucket compartilhado entre threads: no máximo `taxa` requisições
+    # por segundo, com rajadas de até `capacidade`.
+
+    def __init__(self, taxa, capacidade=None):
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade or max(1, taxa))
+        self._fichas = self.capacidade
+        self._atualizado_em = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _repor(self):
+        agora = time.monotonic()
+        self._fichas = min(self.capacidade, self._fichas + (agora - self._atualizado_em) * self.taxa)
+        self._atualizado_em = agora
+
+    def aguardar(self):
+        while True:
+            with self._lock:
+                self._repor()
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                espera = (1 - self._fichas) / self.taxa
+            time.sleep(espera)
@@ -0,0 +1,142 @@
+import math
+import re
+import numpy as np
+import pandas as pd
+
+from normalizacao import tokenizar, converter_preco_brl
+from catalogo_fipe import carregar_catalogo
+
+ARQUIVO_ANUNCIOS = "anuncios_olx.csv"
+ARQUIVO_RESULTADO = "olx_vs_fipe.csv"
+
+PADRAO_ANO = re.compile(r"\b(19[5-9]\d|20[0-4]\d)\b")
+PENALIDADE_SEM_ANO = 0.8
+CANDIDATOS_POR_ANUNCIO = 20
+
+
+def extrair_ano(titulo):
+    anos = PADRAO_ANO.findall(str(titulo))
+    return int(anos[-1]) if anos else None
+
+
+class IndiceModelosFipe:
+    # Índice invertido de tokens sobre os pares (marca, modelo) do catálogo.
+    # Cada ano/versão do catálogo é resolvido depois, por dicionário.
+
+    def __init__(self, catalogo):
+        self.catalogo = catalogo.reset_index(drop=True)
+        modelos = self.catalogo[["Marca", "Modelo"]].drop_duplicates().reset_index(drop=True)
+        self.modelos = modelos
+
+        id_modelo = {(m, mo): i for i, (m, mo) in enumerate(zip(modelos["Marca"], modelos["Modelo"]))}
+        ids = [id_modelo[(m, mo)] for m, mo in zip(self.catalogo["Marca"], self.catalogo["Modelo"])]
+        self.linha_por_ano = dict(zip(zip(ids, self.catalogo["Ano"].astype(int)), self.catalogo.index))
+
+        postagens = {}
+        for i, (marca, modelo) in enumerate(zip(modelos["Marca"], modelos["Modelo"])):
+            for token in set(tokenizar(f"{marca} {modelo}")):
+                postagens.setdefault(token, []).append(i)
+
+        total = len(modelos)
+        self.idf = {t: math.log((total + 1) / (len(p) + 1)) + 1 for t, p in postagens.items()}
+        self.postagens = {t: np.asarray(p, dtype=np.int32) for t, p in postagens.items()}
+
+        normas = np.zeros(total)
+        for token, posicoes in self.postagens.items():
+            normas[posicoes] += self.idf[token] ** 2
+        self.normas = np.sqrt(normas)
+
+    def pontuar(self, titulo):
+        pontuacoes = np.zeros(len(self.modelos))
+        norma_consulta = 0.0
+        for token in set(tokenizar(titulo)):
+            peso = self.idf.get(token)
+            if peso is None:
+                continue
+            pontuacoes[self.postagens[token]] += peso * peso
+            norma_consulta += peso * peso
+        if norma_consulta == 0:
+            return pontuacoes
+        return pontuacoes / (self.normas * math.sqrt(norma_consulta))
+
+    def buscar(self, titulo, k=3, ano=None):
+        pontuacoes = self.pontuar(titulo)
+        if not pontuacoes.any():
+            return []
+        ano = ano if ano is not None else extrair_ano(titulo)
+
+        n = min(CANDIDATOS_POR_ANUNCIO, len(pontuacoes))
+        candidatos = np.argpartition(-pontuacoes, n - 1)[:n]
+        resultado = []
+        for id_modelo in candidatos:
+            score = float(pontuacoes[id_modelo])
+            if score <= 0:
+                continue
+            linha = self.linha_por_ano.get((int(id_modelo), ano)) if ano else None
+            if linha is None:
+                score *= PENALIDADE_SEM_ANO
+            resultado.append((score, int(id_modelo), linha))
+        resultado.sort(key=lambda x: x[0], reverse=True)
+        return resultado[:k]
+
+    def casar_lote(self, titulos, k=1):
+        registros = []
+        for posicao, titulo in enumerate(titulos):
+            for rank, (score, id_modelo, linha) in enumerate(self.buscar(titulo, k), start=1):
+                registros.append({
+                    "Anúncio": posicao,
+                    "Rank": rank,
+                    "Score": round(score, 4),
+                    "Marca": self.modelos.at[id_modelo, "Marca"],
+                    "Modelo": self.modelos.at[id_modelo, "Modelo"],
+                    "Linha Catálogo": linha,
+                })
+        return pd.DataFrame(registros, columns=["Anúncio", "Rank", "Score", "Marca", "Modelo", "Linha Catálogo"])
+
+
+def comparar_anuncios_com_fipe(anuncios, catalogo, indice=None, score_minimo=0.35):
+    indice = indice or IndiceModelosFipe(catalogo)
+    anuncios = anuncios.reset_index(drop=True)
+
+    casamentos = indice.casar_lote(anuncios["produto"], k=1)
+    casamentos = casamentos[casamentos["Score"] >= score_minimo]
+
+    linhas = casamentos["Linha Catálogo"]
+    com_ano = linhas.notna()
+    precos_fipe = pd.Series(np.nan, index=casamentos.index)
+    precos_fipe[com_ano] = indice.catalogo.loc[linhas[com_ano].astype(int), "Preço (R$)"].to_numpy()
+    anos = pd.Series(pd.NA, index=casamentos.index, dtype="Int64")
+    anos[com_ano] = indice.catalogo.loc[linhas[com_ano].astype(int), "Ano"].to_numpy()
+
+    resultado = anuncios.loc[casamentos["Anúncio"]].reset_index(drop=True)
+    resultado["Marca FIPE"] = casamentos["Marca"].to_numpy()
+    resultado["Modelo FIPE"] = casamentos["Modelo"].to_numpy()
+    resultado["Ano FIPE"] = anos.to_numpy()
+    resultado["Score"] = casamentos["Score"].to_numpy()
+    resultado["Preço Anúncio (R$)"] = resultado["preco"].map(converter_preco_brl).astype(float)
+    resultado["Preço FIPE (R$)"] = precos_fipe.to_numpy(dtype=float)
+    resultado["Desconto (%)"] = (
+        (resultado["Preço FIPE (R$)"] - resultado["Preço Anúncio (R$)"]) / resultado["Preço FIPE (R$)"] * 100
+    ).round(2)
+    return resultado.sort_values("Desconto (%)", ascending=False, na_position="last").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    catalogo = carregar_catalogo()
+    if catalogo is None:
+        print("⚠️ Catálogo FIPE não encontrado. Rode 'python catalogo_fipe.py' antes.")
+        exit()
+
+    anuncios = pd.read_csv(ARQUIVO_ANUNCIOS, sep=";", encoding="utf-8-sig")
+    # Os anúncios raspados da OLX são de carros
+    resultado = comparar_anuncios_com_fipe(anuncios, catalogo[catalogo["Tipo"] == "carros"])
+
+    abaixo = resultado[resultado["Desconto (%)"] > 0]
+    print(f"\n✅ {len(resultado)} de {len(anuncios)} anúncios casados com a FIPE; {len(abaixo)} abaixo da tabela.")
+    for _, item in abaixo.head(20).iterrows():
+        print(f"\n🚗 {item['produto']}\n📋 {item['Marca FIPE']} {item['Modelo FIPE']} ({item['Ano FIPE']})"
+              f"\n💰 {item['preco']} vs FIPE R$ {item['Preço FIPE (R$)']:,.2f} → {item['Desconto (%)']:+.2f}%"
+              f"\n🔗 {item['link']}")
+
+    resultado.to_csv(ARQUIVO_RESULTADO, sep=";", index=False, encoding="utf-8-sig")
+    print(f"\n✅ Arquivo '{ARQUIVO_RESULTADO}' salvo com sucesso!")
@@ -0,0 +1,247 @@
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_left
+import numpy as np
+import pandas as pd
+
+from Aula_api_01 import pegar_ids_estados
+from cliente_api import obter_cliente
+from normalizacao import normalizar_texto
+
+ENDPOINT_NOMES = "v2/censos/nomes"
+DECADAS = list(range(1930, 2020, 10))
+SEXOS = ["", "m", "f"]  # "" = ambos os sexos
+LOCALIDADE_BR = 0
+TAMANHO_LOTE = 20  # nomes por request no formato nome1|nome2|...
+
+ARQUIVO_RANKING = os.path.join("dados", "ibge_ranking_nomes.csv.gz")
+ARQUIVO_FREQUENCIAS = os.path.join("dados", "ibge_frequencia_nomes.csv.gz")
+PASTA_CACHE = os.path.join("dados", "cache_ibge")  # permanente: dados do censo não mudam
+
+
+def chave_nome(nome):
+    # A API devolve os nomes sem acento e em maiúsculas: "João" → "JOAO"
+    return normalizar_texto(nome).upper()
+
+
+def fazer_request(endpoint, parametros=None):
+    # Pool, retentativas e limite de taxa ficam no cliente "ibge"
+    return obter_cliente("ibge").obter_json(endpoint, parametros)
+
+
+def decada_do_periodo(periodo):
+    # "[1930,1940[" → 1930; "1930[" (antes de 1930) → 1920
+    anos = re.findall(r"\d{4}", periodo)
+    if not anos:
+        return None
+    return int(anos[0]) if periodo.startswith("[") else int(anos[0]) - 10
+
+
+def baixar_ranking(decada, localidade=LOCALIDADE_BR, sexo=""):
+    parametros = {"decada": decada}
+    if localidade != LOCALIDADE_BR:
+        parametros["localidade"] = localidade
+    if sexo:
+        parametros["sexo"] = sexo
+    dados = fazer_request(f"{ENDPOINT_NOMES}/ranking", parametros)
+    if not dados:
+        return []
+    return [
+        {"nome": r["nome"], "decada": decada, "localidade": localidade, "sexo": sexo,
+         "ranking": r["ranking"], "frequencia": r["frequencia"]}
+        for r in dados[0]["res"]
+    ]
+
+
+def _ler_json(caminho):
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def _gravar_json(caminho, dados):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.{threading.get_ident()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(dados, arquivo, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def obter_estados():
+    caminho = os.path.join(PASTA_CACHE, "estados.json")
+    estados = _ler_json(caminho)
+    if estados is None:
+        estados = pegar_ids_estados()
+        if not estados:
+            return {}
+        _gravar_json(caminho, estados)
+    return {int(id_estado): nome for id_estado, nome in estados.items()}
+
+
+def baixar_ranking_cacheado(decada, localidade=LOCALIDADE_BR, sexo=""):
+    caminho = os.path.join(PASTA_CACHE, f"ranking_{decada}_{localidade}_{sexo or 'todos'}.json")
+    registros = _ler_json(caminho)
+    if registros is None:
+        registros = baixar_ranking(decada, localidade, sexo)
+        if registros:
+            _gravar_json(caminho, registros)
+    return registros
+
+
+def agregar_rankings(decadas=DECADAS, sexos=("m", "f"), ufs=None, max_workers=8):
+    # Dispara todas as combinações década × sexo × UF em paralelo; o limite de taxa é o do cliente "ibge"
+    estados = obter_estados()
+    ufs = sorted(estados) if ufs is None else list(ufs)
+    combinacoes = [(d, uf, s) for d in decadas for uf in ufs for s in sexos]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        resultados = executor.map(lambda c: baixar_ranking_cacheado(*c), combinacoes)
+        registros = [r for lista in resultados for r in lista]
+
+    colunas = ["decada", "sexo", "localidade", "UF", "ranking", "nome", "frequencia"]
+    if not registros:
+        return pd.DataFrame(columns=colunas)
+    ranking = compactar_ranking(pd.DataFrame(registros))
+    ranking["UF"] = ranking["localidade"].map(lambda i: estados.get(i, "Brasil")).astype("category")
+    return ranking[colunas].sort_values(["decada", "sexo", "localidade", "ranking"]).reset_index(drop=True)
+
+
+def baixar_frequencias_lote(nomes, tamanho_lote=TAMANHO_LOTE):
+    # A API aceita vários nomes separados por "|"; nomes sem dados voltam como [],
+    # nomes de lotes que falharam voltam como None
+    nomes = list(dict.fromkeys(chave for chave in map(chave_nome, nomes) if chave))
+    resultado = {}
+    for inicio in range(0, len(nomes), tamanho_lote):
+        lote = nomes[inicio:inicio + tamanho_lote]
+        dados = fazer_request(f"{ENDPOINT_NOMES}/{'|'.join(n.lower() for n in lote)}")
+        if dados is None:
+            resultado.update(dict.fromkeys(lote))
+            continue
+        resultado.update({nome: [] for nome in lote})
+        for item in dados:
+            resultado[chave_nome(item["nome"])] = [
+                {"periodo": r["periodo"], "frequencia": r["frequencia"]} for r in item["res"]
+            ]
+    return resultado
+
+
+def registros_frequencias(frequencias_por_nome):
+    return [
+        {"nome": nome, "periodo": r["periodo"], "decada": decada_do_periodo(r["periodo"]), "frequencia": r["frequencia"]}
+        for nome, res in frequencias_por_nome.items() if res
+        for r in res
+    ]
+
+
+def compactar(df, inteiros):
+    df = df.copy()
+    for coluna, tipo in inteiros.items():
+        df[coluna] = df[coluna].astype(tipo)
+    for coluna in df.columns.difference(list(inteiros)):
+        df[coluna] = df[coluna].fillna("").astype("category")
+    return df
+
+
+def compactar_ranking(ranking):
+    return compactar(ranking, {"decada": "int16", "localidade": "int16", "ranking": "int16", "frequencia": "int32"})
+
+
+def compactar_frequencias(frequencias):
+    return compactar(frequencias, {"decada": "int16", "frequencia": "int32"})
+
+
+def baixar_base_completa(decadas=DECADAS, sexos=SEXOS):
+    print("📥 Rankings por década, sexo e UF...")
+    ufs = [LOCALIDADE_BR] + sorted(obter_estados())
+    ranking = agregar_rankings(decadas, sexos, ufs).drop(columns="UF")
+
+    nomes = sorted(ranking["nome"].unique())
+    print(f"📥 Frequências por década de {len(nomes)} nomes...")
+    frequencias = compactar_frequencias(pd.DataFrame(registros_frequencias(baixar_frequencias_lote(nomes))))
+    return ranking, frequencias
+
+
+def _salvar_atomico(df, caminho):
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = f"{caminho}.tmp"
+    df.to_csv(temporario, index=False, compression="gzip")
+    os.replace(temporario, caminho)
+
+
+def salvar_base(ranking, frequencias):
+    _salvar_atomico(ranking, ARQUIVO_RANKING)
+    _salvar_atomico(frequencias, ARQUIVO_FREQUENCIAS)
+
+
+def carregar_base():
+    if not (os.path.exists(ARQUIVO_RANKING) and os.path.exists(ARQUIVO_FREQUENCIAS)):
+        return None
+    ranking = pd.read_csv(ARQUIVO_RANKING, keep_default_na=False)
+    frequencias = pd.read_csv(ARQUIVO_FREQUENCIAS, keep_default_na=False)
+    return compactar_ranking(ranking), compactar_frequencias(frequencias)
+
+
+class IndiceNomes:
+    # Índice em memória sobre a base local: frequências por nome, rankings
+    # por (década, localidade, sexo) e busca por prefixo via bisect.
+
+    def __init__(self, ranking, frequencias):
+        frequencias = frequencias.sort_values(["nome", "decada"], kind="stable")
+        nomes = frequencias["nome"].astype(str).to_numpy()
+        unicos, inicios = np.unique(nomes, return_index=True)
+        fins = np.append(inicios[1:], len(nomes))
+        self._fatias = {nome: (i, f) for nome, i, f in zip(unicos, inicios, fins)}
+        self._periodos = frequencias["periodo"].astype(str).to_numpy()
+        self._frequencias = frequencias["frequencia"].to_numpy()
+
+        self._rankings = {
+            (int(decada), int(localidade), str(sexo)): grupo.sort_values("ranking").reset_index(drop=True)
+            for (decada, localidade, sexo), grupo in ranking.groupby(["decada", "localidade", "sexo"], observed=True)
+        }
+        self.nomes = sorted(set(unicos) | set(ranking["nome"].astype(str)))
+
+    @classmethod
+    def carregar(cls):
+        base = carregar_base()
+        return cls(*base) if base else None
+
+    def __contains__(self, nome):
+        return chave_nome(nome) in self._fatias
+
+    def frequencia_por_decada(self, nome):
+        fatia = self._fatias.get(chave_nome(nome))
+        if fatia is None:
+            return None
+        inicio, fim = fatia
+        return [
+            {"periodo": p, "frequencia": int(f)}
+            for p, f in zip(self._periodos[inicio:fim], self._frequencias[inicio:fim])
+        ]
+
+    def ranking_por(self, decada, localidade=LOCALIDADE_BR, sexo=""):
+        return self._rankings.get((int(decada), int(localidade), sexo))
+
+    def buscar_prefixo(self, prefixo, limite=10):
+        prefixo = chave_nome(prefixo)
+        if not prefixo:
+            return []
+        posicao = bisect_left(self.nomes, prefixo)
+        encontrados = []
+        for nome in self.nomes[posicao:posicao + limite]:
+            if not nome.startswith(prefixo):
+                break
+            encontrados.append(nome)
+        return encontrados
+
+
+if __name__ == "__main__":
+    ranking, frequencias = baixar_base_completa()
+    if ranking.empty:
+        print("\n⚠️ Nenhum ranking obtido.")
+    else:
+        salvar_base(ranking, frequencias)
+        print(f"\n✅ {len(ranking)} posições de ranking e {frequencias['nome'].nunique()} nomes salvos em 'dados/'")
@@ -0,0 +1,48 @@
+import re
+import unicodedata
+
+# Abreviações comuns em anúncios mapeadas para a grafia usada pela FIPE
+SINONIMOS = {
+    "vw": "volkswagen",
+    "volks": "volkswagen",
+    "gm": "chevrolet",
+    "chevy": "chevrolet",
+    "automatico": "aut",
+    "automatica": "aut",
+    "automatizado": "aut",
+    "mecanico": "mec",
+    "sedan": "sed",
+    "hatchback": "hatch",
+    "flexone": "flex",
+    "flexpower": "flex",
+    "totalflex": "flex",
+    "portas": "p",
+}
+
+PADRAO_TOKEN = re.compile(r"\d+\.\d+|[a-z0-9]+")
+
+
+def normalizar_texto(texto):
+    if not texto:
+        return ""
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = texto.lower().replace(",", ".")
+    return re.sub(r"[^a-z0-9.]+", " ", texto).strip()
+
+
+def tokenizar(texto):
+    tokens = PADRAO_TOKEN.findall(normalizar_texto(texto))
+    return [SINONIMOS.get(t, t) for t in tokens]
+
+
+def converter_preco_brl(preco_str):
+    if preco_str is None:
+        return None
+    if isinstance(preco_str, (int, float)):
+        return float(preco_str)
+    limpo = re.sub(r"[^\d,]", "", str(preco_str)).replace(",", ".")
+    try:
+        return float(limpo)
+    except ValueError:
+        return None
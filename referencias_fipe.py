@@ -0,0 +1,59 @@
+import re
+from functools import lru_cache
+import pandas as pd
+
+from cache_ttl import CacheTTL
+from cliente_api import obter_cliente
+
+MESES = {
+    "janeiro": 1, "fevereiro": 2, "março": 3, "marco": 3, "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+}
+TTL_CALENDARIO = 12 * 3600  # uma referência nova por mês
+
+# Como cada API descreve a lista de referências
+FONTES = {
+    "fipe_v2": {"endpoint": "references", "corpo": None, "codigo": "code", "mes": "month"},
+    "fipe_oficial": {"endpoint": "ConsultarTabelaDeReferencia", "corpo": {}, "codigo": "Codigo", "mes": "Mes"},
+}
+
+_calendarios = CacheTTL(ttl=TTL_CALENDARIO, max_itens=len(FONTES))
+
+
+@lru_cache(maxsize=2048)
+def data_do_mes(mes):
+    # "outubro de 2024" (v2) ou "outubro/2024 " (oficial) → Timestamp('2024-10-01')
+    encontrado = re.match(r"\s*([a-zç]+)\s*(?:de|/)\s*(\d{4})", str(mes).lower())
+    if not encontrado or encontrado.group(1) not in MESES:
+        return pd.NaT
+    return pd.Timestamp(year=int(encontrado.group(2)), month=MESES[encontrado.group(1)], day=1)
+
+
+def _baixar_calendario(fonte):
+    config = FONTES[fonte]
+    cliente = obter_cliente(fonte)
+    referencias = cliente.obter_json(config["endpoint"], corpo=config["corpo"]) or []
+    calendario = pd.DataFrame({
+        "codigo": [int(r[config["codigo"]]) for r in referencias],
+        "mes": [str(r[config["mes"]]).strip() for r in referencias],
+    })
+    calendario["data"] = calendario["mes"].map(data_do_mes)
+    return calendario.set_index("codigo").sort_values("data")
+
+
+def calendario(fonte="fipe_v2"):
+    # Código da referência → primeiro dia do mês, montado uma vez por fonte (cache de 12h)
+    calendario_fonte = _calendarios.obter_ou_calcular(fonte, lambda: _baixar_calendario(fonte))
+    if calendario_fonte.empty:
+        _calendarios.limpar()
+    return calendario_fonte
+
+
+def montar_historico(registros, coluna_mes="Mês"):
+    # Frame indexado pelo mês de referência (DatetimeIndex ordenado, sem meses repetidos)
+    df = pd.DataFrame(registros)
+    if df.empty:
+        return df
+    df.index = pd.DatetimeIndex(df[coluna_mes].map(data_do_mes), name="Data")
+    df = df[df.index.notna()]
+    return df[~df.index.duplicated(keep="last")].sort_index()
@@ -0,0 +1,151 @@
+import argparse
+import gc
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+ARTISTAS = ["Anitta", "Coldplay", "Marília Mendonça", "Metallica", "Taylor Swift", "Jorge & Mateus", "Queen"]
+PERCENTIS = (50, 90, 95, 99)
+
+
+def rodar(app, medicoes, etapa):
+    inicio = time.perf_counter()
+    app.run()
+    medicoes.append({"etapa": etapa, "latencia_ms": (time.perf_counter() - inicio) * 1000, "erro": bool(app.exception)})
+
+
+def fluxo_fipe(app, medicoes, sorteio):
+    # marca → modelo → ano: cada seleção gera o próximo selectbox (vazio) no rerun seguinte
+    for i, etapa in enumerate(("marca", "modelo", "ano")):
+        if len(app.selectbox) <= i or len(app.selectbox[i].options) < 2:
+            return
+        caixa = app.selectbox[i]
+        caixa.select(sorteio.choice(caixa.options[1:]))
+        rodar(app, medicoes, etapa)
+
+
+def fluxo_spotify(app, medicoes, sorteio):
+    nome = sorteio.choice(ARTISTAS)
+    # Digitação em dois passos, como o usuário fazendo o typeahead
+    for tamanho in (3, len(nome)):
+        app.text_input[0].input(nome[:tamanho])
+        rodar(app, medicoes, "busca")
+    if app.selectbox and len(app.selectbox[0].options) > 1:
+        app.selectbox[0].set_value(sorteio.choice(app.selectbox[0].options))
+        rodar(app, medicoes, "artista")
+
+
+FLUXOS = {
+    "Projeto_FIPE.py": fluxo_fipe,
+    "Aula_api_combinando_requests.py": fluxo_fipe,
+    "Api_Spotify.py": fluxo_spotify,
+}
+
+
+def simular_sessao(script, semente, repeticoes, timeout, medir_memoria=False):
+    # Uma sessão por processo: o AppTest usa o Runtime do Streamlit, que é único por processo
+    from streamlit.testing.v1 import AppTest
+    from cliente_api import resumo_metricas
+
+    if medir_memoria:
+        tracemalloc.start()
+    sorteio = random.Random(semente)
+    medicoes = []
+    app = AppTest.from_file(script, default_timeout=timeout)
+    rodar(app, medicoes, "inicial")
+    for _ in range(repeticoes):
+        FLUXOS[os.path.basename(script)](app, medicoes, sorteio)
+
+    resultado = {"medicoes": medicoes, "rss_mb": memoria_rss_mb(), "metricas": resumo_metricas()}
+    if medir_memoria:
+        gc.collect()
+        # A sessão (AppTest, session_state e caches do app) ainda está viva aqui
+        resultado["retida_mb"] = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+        tracemalloc.stop()
+    return resultado
+
+
+def resumir_latencias(medicoes):
+    df = pd.DataFrame(medicoes)
+    linhas = []
+    for etapa, grupo in [("todas", df)] + list(df.groupby("etapa", sort=False)):
+        valores = grupo["latencia_ms"].to_numpy()
+        linha = {"etapa": etapa, "reruns": len(valores), "erros": int(grupo["erro"].sum())}
+        linha.update({f"p{p} (ms)": round(float(v), 1) for p, v in zip(PERCENTIS, np.percentile(valores, PERCENTIS))})
+        linha["max (ms)"] = round(float(valores.max()), 1)
+        linhas.append(linha)
+    return pd.DataFrame(linhas)
+
+
+def memoria_rss_mb():
+    # ru_maxrss vem em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(
+        description="Teste de carga dos apps Streamlit com N sessões simuladas (AppTest).",
+        epilog="Grave os cassetes uma vez com --modo gravar (rede real) e rode a carga com --modo reproduzir.",
+    )
+    parser.add_argument("script", help=f"caminho do app: {', '.join(sorted(FLUXOS))}")
+    parser.add_argument("--sessoes", type=int, default=10, help="sessões simultâneas (um processo cada)")
+    parser.add_argument("--repeticoes", type=int, default=3, help="fluxos completos por sessão")
+    parser.add_argument("--modo", choices=("gravar", "reproduzir"), default="reproduzir")
+    parser.add_argument("--velocidade", type=float, default=1.0, help="escala das latências gravadas (0 = sem espera)")
+    parser.add_argument("--timeout", type=float, default=120, help="limite por rerun, em segundos")
+    parser.add_argument("--memoria", action="store_true", help="mede memória retida por sessão com tracemalloc (mais lento)")
+    parser.add_argument("--semente", type=int, default=0)
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    if os.path.basename(args.script) not in FLUXOS:
+        print(f"⚠️ Sem fluxo simulado para '{args.script}'. Apps suportados: {', '.join(sorted(FLUXOS))}")
+        return 2
+    # Herdadas pelos processos das sessões e lidas quando os clientes são criados
+    os.environ["API_GRAVACAO"] = args.modo
+    os.environ["API_GRAVACAO_VELOCIDADE"] = str(args.velocidade)
+
+    inicio = time.perf_counter()
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=args.sessoes, mp_context=contexto) as executor:
+        futuros = [
+            executor.submit(simular_sessao, args.script, args.semente + i, args.repeticoes, args.timeout, args.memoria)
+            for i in range(args.sessoes)
+        ]
+        sessoes = [futuro.result() for futuro in futuros]
+    duracao = time.perf_counter() - inicio
+
+    medicoes = [m for sessao in sessoes for m in sessao["medicoes"]]
+    print(f"🚦 {args.sessoes} sessões × {args.repeticoes} fluxos de '{args.script}' em {duracao:.1f}s "
+          f"({len(medicoes) / duracao:.1f} reruns/s)\n")
+    print(resumir_latencias(medicoes).to_string(index=False))
+
+    print()
+    rss = np.array([sessao["rss_mb"] for sessao in sessoes])
+    print(f"🧠 RSS por sessão: média {rss.mean():.1f} MB, máx {rss.max():.1f} MB")
+    if args.memoria:
+        retida = np.array([sessao["retida_mb"] for sessao in sessoes])
+        print(f"🧠 Memória Python retida por sessão: média {retida.mean():.1f} MB, máx {retida.max():.1f} MB")
+
+    totais = {}
+    for sessao in sessoes:
+        for nome, metricas in sessao["metricas"].items():
+            total = totais.setdefault(nome, {"requisicoes": 0, "erros": 0, "acertos_cache": 0})
+            for campo in total:
+                total[campo] += metricas[campo]
+    for nome, total in totais.items():
+        print(f"🌐 {nome}: {total}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+# Cada API identifica o tipo de veículo de um jeito: caminho na v2 (parallelum) e código na oficial
+TIPOS_VEICULO = {
+    "carros": {"rotulo": "Carros", "v2": "cars", "oficial": 1},
+    "motos": {"rotulo": "Motos", "v2": "motorcycles", "oficial": 2},
+    "caminhoes": {"rotulo": "Caminhões", "v2": "trucks", "oficial": 3},
+}
+TIPO_PADRAO = "carros"
+
+
+def caminho_v2(tipo=TIPO_PADRAO):
+    return TIPOS_VEICULO[tipo]["v2"]
+
+
+def codigo_oficial(tipo=TIPO_PADRAO):
+    return TIPOS_VEICULO[tipo]["oficial"]
+
+
+def tipo_por_codigo(codigo):
+    return next(nome for nome, tipo in TIPOS_VEICULO.items() if tipo["oficial"] == int(codigo))
@@ -0,0 +1,299 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+from alertas_fipe import processar_alertas, veiculos_acompanhados
+from armazem_fipe import ARQUIVO_HISTORICOS, CHAVE_VEICULO, carregar_historicos, mesclar_historicos
+from catalogo_fipe import CatalogoIncompleto, ProgressoCatalogo, montar_catalogo_tipos, salvar_catalogo
+from cota_api import com_prioridade_atual, definir_prioridade_padrao, prioridade
+from depreciacao_fipe import atualizar_indice
+from exportar_historicos_fipe import linhas_do_veiculo
+from historico_fipe import obter_referencias, requisitar_dados
+from indice_fuzzy import indice_para_lista
+from referencias_fipe import MESES, data_do_mes
+from tipos_veiculo import TIPO_PADRAO, caminho_v2, codigo_oficial
+
+ARQUIVO_ESTADO = os.path.join("dados", "estado_worker.json")
+ARQUIVO_TRAVA = os.path.join("dados", "worker.lock")
+MESES_HISTORICO = 25  # 24 meses no painel + o mês anterior para a primeira variação
+MESES_ACOMPANHADOS = 2  # lista de acompanhamento: o mês atual e o anterior bastam para os alertas
+INTERVALO = 3600  # checagem de referência nova a cada hora
+IDADE_MAXIMA = 6 * 3600  # acima disso a leitura pelos apps dispara revalidação em segundo plano
+ESPERA_APOS_FALHA = 15 * 60  # API fora do ar: os apps não redisparam a revalidação a cada rerun
+TRAVA_EXPIRADA = 2 * 3600  # trava de processo que morreu no meio da atualização
+RENOVAR_TRAVA = 10 * 60  # quem segura a trava renova o mtime: rastreamentos longos não a deixam expirar
+
+# União dos veículos fixos de Projeto_FIPE, Aula_api_combinando_requests e Projeto_FIPE_paralela
+VEICULOS_FIXOS = [
+    ("Toyota", "Corolla XEi 2.0 Flex 16V Aut.", 2012),
+    ("Nissan", "Sentra SL 2.0/ 2.0 Flex Fuel 16V Aut.", 2016),
+    ("Honda", "Civic Sed. LXL/ LXL SE 1.8 Flex 16V Aut.", 2013),
+    ("Hyundai", "ix35 GLS 2.0 16V 2WD Flex Aut.", 2012),
+    ("Hyundai", "ix35 2.0 16V 170cv 2WD/4WD Aut.", 2012),
+    ("Hyundai", "Santa Fe/GLS 3.3 V6 4X4 Tiptronic", 2012),
+    ("Hyundai", "Santa Fe GLS 3.5 V6 4x4 Tiptronic", 2013),
+    ("Kia Motors", "Sportage EX 2.0 16V/ 2.0 16V Flex Aut.", 2012),
+    ("Kia Motors", "Sorento 3.5 V6 24V 4x2 Aut.", 2013),
+]
+
+NOMES_MESES = {numero: nome for nome, numero in MESES.items() if nome != "marco"}
+
+_revalidacao = threading.Lock()
+
+
+def chave_fixo(marca, modelo, ano):
+    return f"{marca}|{modelo}|{ano}"
+
+
+def ler_estado(caminho=ARQUIVO_ESTADO):
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def gravar_estado(estado, caminho=ARQUIVO_ESTADO):
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(estado, arquivo, ensure_ascii=False, indent=1)
+    os.replace(temporario, caminho)
+
+
+def adquirir_trava(caminho=ARQUIVO_TRAVA):
+    # Trava entre processos (worker agendado e apps): só uma atualização por vez
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    if os.path.exists(caminho) and time.time() - os.path.getmtime(caminho) > TRAVA_EXPIRADA:
+        os.remove(caminho)
+    try:
+        os.close(os.open(caminho, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        return False
+
+
+def liberar_trava(caminho=ARQUIVO_TRAVA):
+    if os.path.exists(caminho):
+        os.remove(caminho)
+
+
+def manter_trava(parar, caminho=ARQUIVO_TRAVA):
+    while not parar.wait(RENOVAR_TRAVA):
+        try:
+            os.utime(caminho)
+        except FileNotFoundError:
+            return
+
+
+def _procurar(lista, nome):
+    # Mesmo critério dos apps (trecho do nome); se falhar, o nome mais parecido pelo índice fuzzy
+    for item in lista:
+        if nome.lower() in item["name"].lower():
+            return item
+    candidatos = indice_para_lista(lista, "name", "code").buscar(nome, k=1, corte=0.6)
+    if candidatos:
+        codigo = candidatos[0][0]
+        return next(item for item in lista if item["code"] == codigo)
+    return None
+
+
+def resolver_veiculo(marca, modelo, ano, tipo=TIPO_PADRAO):
+    caminho = caminho_v2(tipo)
+    marca_api = _procurar(requisitar_dados(f"{caminho}/brands") or [], marca)
+    if not marca_api:
+        return None
+    modelo_api = _procurar(requisitar_dados(f"{caminho}/brands/{marca_api['code']}/models") or [], modelo)
+    if not modelo_api:
+        return None
+    anos = requisitar_dados(f"{caminho}/brands/{marca_api['code']}/models/{modelo_api['code']}/years") or []
+    ano_api = next((a for a in anos if a["code"].startswith(f"{ano}-")), None)
+    if not ano_api:
+        return None
+    return {
+        "Marca": marca_api["name"], "Código Marca": int(marca_api["code"]),
+        "Modelo": modelo_api["name"], "Código Modelo": int(modelo_api["code"]),
+        "Código Ano": ano_api["code"],
+        "Tipo": tipo,
+    }
+
+
+def _linhas_do_veiculo(historicos, veiculo):
+    return historicos[
+        (historicos["tipo_veiculo"] == codigo_oficial(veiculo.get("Tipo", TIPO_PADRAO)))
+        & (historicos["codigo_marca"] == veiculo["Código Marca"])
+        & (historicos["codigo_modelo"] == veiculo["Código Modelo"])
+        & (historicos["codigo_ano"] == veiculo["Código Ano"])
+    ]
+
+
+def meses_no_armazem(historicos):
+    # (veículo, mês) montado uma vez: checar milhares de veículos não varre o armazém a cada um
+    return set(zip(*(historicos[coluna] for coluna in CHAVE_VEICULO + ["data_referencia"])))
+
+
+def referencias_faltando(no_armazem, veiculo, referencias):
+    chave = (codigo_oficial(veiculo.get("Tipo", TIPO_PADRAO)), veiculo["Código Marca"],
+             veiculo["Código Modelo"], veiculo["Código Ano"])
+    return [ref for ref in referencias if chave + (data_do_mes(ref["month"]),) not in no_armazem]
+
+
+def atualizar(veiculos=VEICULOS_FIXOS, com_catalogo=True, com_acompanhados=True, trabalhadores=4):
+    # Só baixa os meses que faltam no armazém; mês já publicado pela FIPE não muda
+    referencias = obter_referencias(MESES_HISTORICO)
+    estado = ler_estado()
+    if not referencias:
+        print("❌ Erro ao obter referências FIPE.")
+        gravar_estado({**estado, "tentado_em": time.time()})
+        return False
+    mes_novo = estado.get("ultima_referencia") != referencias[0]["code"]
+    resolvidos = estado.get("veiculos", {})
+
+    for marca, modelo, ano in veiculos:
+        chave = chave_fixo(marca, modelo, ano)
+        if chave not in resolvidos:
+            veiculo = resolver_veiculo(marca, modelo, ano)
+            if veiculo:
+                resolvidos[chave] = veiculo
+            else:
+                print(f"[NULO] {marca} - {modelo} ({ano}) não encontrado na FIPE")
+
+    no_armazem = meses_no_armazem(carregar_historicos())
+    pendentes = []
+    for marca, modelo, ano in veiculos:
+        veiculo = resolvidos.get(chave_fixo(marca, modelo, ano))
+        faltando = referencias_faltando(no_armazem, veiculo, referencias) if veiculo else []
+        if faltando:
+            pendentes.append((veiculo, faltando))
+    if com_acompanhados:
+        for veiculo in veiculos_acompanhados():
+            faltando = referencias_faltando(no_armazem, veiculo, referencias[:MESES_ACOMPANHADOS])
+            if faltando:
+                pendentes.append((veiculo, faltando))
+    with ThreadPoolExecutor(max_workers=trabalhadores) as executor:
+        lotes = list(executor.map(com_prioridade_atual(lambda par: linhas_do_veiculo(*par)), pendentes))
+    novas = [linha for lote in lotes for linha in lote]
+    if novas:
+        historicos = mesclar_historicos(pd.DataFrame(novas))
+        atualizar_indice(historicos)
+        alertas = processar_alertas(historicos)
+        if not alertas.empty:
+            print(f"🔔 {len(alertas)} alertas novos da lista de acompanhamento")
+
+    # ultima_referencia é a referência do catálogo salvo: só avança quando o catálogo novo está completo
+    ultima_referencia = estado.get("ultima_referencia")
+    if com_catalogo and mes_novo:
+        print("📥 Referência nova: atualizando o catálogo...")
+        progresso = ProgressoCatalogo(referencias[0]["code"])
+        try:
+            catalogo = montar_catalogo_tipos(progresso=progresso)
+        except CatalogoIncompleto as erro:
+            print(f"⚠️ Catálogo incompleto ({erro}); {len(progresso.concluidas)} marcas guardadas para a próxima execução.")
+        else:
+            if not catalogo.empty:
+                salvar_catalogo(catalogo)
+                progresso.remover()
+                ultima_referencia = referencias[0]["code"]
+
+    gravar_estado({
+        "ultima_referencia": ultima_referencia,
+        "mes_referencia": referencias[0]["month"],
+        "atualizado_em": time.time(),
+        "veiculos": resolvidos,
+    })
+    print(f"✅ {len(novas)} preços novos ({len(pendentes)} veículos com meses faltando)")
+    return True
+
+
+def atualizar_com_trava(**kwargs):
+    if not adquirir_trava():
+        return False
+    parar = threading.Event()
+    threading.Thread(target=manter_trava, args=(parar,), daemon=True, name="trava-worker").start()
+    try:
+        return atualizar(**kwargs)
+    finally:
+        parar.set()
+        liberar_trava()
+
+
+# --- Leitura pelos apps: só dados pré-calculados, nunca a API no caminho do usuário
+
+def versao_armazem():
+    # Muda a cada escrita atômica do armazém/estado: serve de chave para o st.cache_data dos apps
+    return tuple(os.path.getmtime(c) if os.path.exists(c) else 0.0 for c in (ARQUIVO_HISTORICOS, ARQUIVO_ESTADO))
+
+
+def revalidar_se_necessario(veiculos=VEICULOS_FIXOS, idade_maxima=IDADE_MAXIMA):
+    # Stale-while-revalidate: quem lê recebe o que já existe; a atualização roda em segundo plano
+    estado = ler_estado()
+    agora = time.time()
+    if agora - estado.get("atualizado_em", 0) < idade_maxima:
+        return False
+    if agora - estado.get("tentado_em", 0) < ESPERA_APOS_FALHA:
+        return False
+    if not _revalidacao.acquire(blocking=False):
+        return False
+
+    def executar():
+        try:
+            with prioridade("atualizacao"):
+                # A lista de acompanhamento pode ter milhares de veículos: fica para o worker agendado
+                atualizar_com_trava(veiculos=veiculos, com_catalogo=False, com_acompanhados=False)
+        finally:
+            _revalidacao.release()
+
+    threading.Thread(target=executar, daemon=True, name="revalidacao-fipe").start()
+    return True
+
+
+def nome_do_mes(data):
+    return f"{NOMES_MESES[data.month]} de {data.year}"
+
+
+def historico_do_armazem(historicos, veiculo, num_meses):
+    linhas = _linhas_do_veiculo(historicos, veiculo).sort_values("data_referencia").tail(num_meses)
+    if len(linhas) < 2:
+        return None
+    datas = pd.DatetimeIndex(linhas["data_referencia"], name="Data")
+    return pd.DataFrame({"Mês": datas.map(nome_do_mes), "Preço (R$)": linhas["preco"].to_numpy()}, index=datas)
+
+
+def ler_fixos(veiculos, num_meses):
+    # [(marca, modelo, ano, veículo resolvido ou None, histórico ou None)] direto do armazém local
+    resolvidos = ler_estado().get("veiculos", {})
+    historicos = carregar_historicos()
+    fixos = []
+    for marca, modelo, ano in veiculos:
+        veiculo = resolvidos.get(chave_fixo(marca, modelo, ano))
+        df = historico_do_armazem(historicos, veiculo, num_meses) if veiculo else None
+        fixos.append((marca, modelo, ano, veiculo, df))
+    return fixos
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Atualiza em segundo plano os históricos FIPE usados pelos painéis.")
+    parser.add_argument("--uma-vez", action="store_true", help="atualiza uma vez e sai (para cron/agendador)")
+    parser.add_argument("--intervalo", type=int, default=INTERVALO, help="segundos entre as checagens")
+    parser.add_argument("--sem-catalogo", action="store_true", help="não refaz o catálogo quando sai mês novo")
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    definir_prioridade_padrao("atualizacao")
+    while True:
+        ok = atualizar_com_trava(com_catalogo=not args.sem_catalogo)
+        if not ok:
+            print("⏳ Outra atualização em andamento ou API indisponível; tentando no próximo ciclo.")
+        if args.uma_vez:
+            return 0 if ok else 1
+        time.sleep(args.intervalo)
+
+
+if __name__ == "__main__":
+    sys.exit(main())